@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from firebase_admin import auth, exceptions
@@ -5,15 +8,24 @@ from loguru import logger
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token") # tokenUrl is not used, but required
 
+# Token verification is synchronous and periodically refetches Google's public keys over HTTP.
+# It runs on a small dedicated pool so it neither blocks the event loop nor competes with
+# other work on FastAPI's shared threadpool.
+_auth_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="firebase-auth")
+
+def shutdown_auth_executor() -> None:
+    """Stops the token verification pool without waiting for in-flight verifications."""
+    _auth_executor.shutdown(wait=False)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Dependency to verify Firebase ID token and get user data.
     """
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = await asyncio.get_running_loop().run_in_executor(_auth_executor, auth.verify_id_token, token)
         return decoded_token
     except exceptions.FirebaseError as e:
-        logger.warning(f"Invalid Firebase token: {e}")
+        logger.warning("Invalid Firebase token: {}", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -21,7 +33,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         )
     except ValueError as e:
         # This can happen if the token is malformed
-        logger.warning(f"Malformed Firebase token: {e}")
+        logger.warning("Malformed Firebase token: {}", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Malformed authentication token",
@@ -1,44 +1,151 @@
 # src/backend/app/api/v1/endpoints.py
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query, Security
-from typing import Annotated, List, Any, Dict
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, Query, Security
+from typing import Annotated, Any, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncpg
 from loguru import logger
-import time
+from cachetools import TTLCache
+import asyncio
+import base64
+import binascii
 
-from app.schemas.population import MarketDataRequest, PopulationDataResponse, ErrorResponse, CacheDeleteRequest
+from app.schemas.population import MarketDataRequest, PopulationDataResponse, ErrorResponse, CacheDeleteRequest, CachedAddressPage
 from app.services.census_service import CensusService
-from app.db.session import get_db_session
+from app.db.session import get_db_session, get_raw_pool
 from app.api.deps import get_current_user
+from app.core.config import settings
 
 # --- Dependency Injection Setup ---
-# By creating service instances here, FastAPI can manage their lifecycle.
-# This is a placeholder for a more robust dependency injection system if needed.
-from httpx import AsyncClient
-from app.services.cache_manager import CacheManager
-from app.services.geocoding_service import GeocodingService
+# The CensusService and its sub-services are stateless, so a single instance is
+# built at application startup and shared by every request.
+from httpx import AsyncClient, Limits, Timeout
+from app.services.cache_manager import CacheManager, normalize_address
+from app.services.geocoding_service import AddressNotGeocodedError, GeocodingService
 from app.services.census_api_client import CensusAPIClient
 from app.services.data_processor import DataProcessor
 
-# Create a single HTTP client to be shared across services for connection pooling
-http_client = AsyncClient(timeout=20.0)
+def create_http_client() -> AsyncClient:
+    """
+    Creates the HTTP client shared across services for upstream connection pooling.
+    HTTP/2 lets the concurrent Census requests of a cache miss share one TLS connection per host.
+    Responses are requested compressed (gzip, and br when brotli is installed) and decoded by httpx.
+    """
+    return AsyncClient(
+        http2=True,
+        # Nominatim's usage policy requires an identifying User-Agent; every upstream gets the same one.
+        headers={"User-Agent": "CapMatch/1.0"},
+        timeout=Timeout(20.0, connect=5.0),
+        limits=Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_CONNECTIONS // 2,
+            keepalive_expiry=30,
+        ),
+    )
+
+def create_census_service(http_client: AsyncClient, raw_pool: asyncpg.Pool) -> CensusService:
+    """Wires the CensusService and its sub-services around the shared HTTP client and database pool."""
+    return CensusService(
+        CacheManager(),
+        GeocodingService(http_client, raw_pool),
+        CensusAPIClient(http_client),
+        DataProcessor(),
+    )
+
+def get_census_service(request: Request) -> CensusService:
+    """Returns the process-wide CensusService created at startup."""
+    return request.app.state.census_service
+
+# --- In-Process Response Cache ---
+# Hot addresses are served from memory, skipping the database round-trip entirely.
+# Each worker process holds its own copy, so entries are short-lived.
+_ADDR_CACHE: TTLCache = TTLCache(maxsize=settings.RESPONSE_CACHE_MAXSIZE, ttl=settings.RESPONSE_CACHE_TTL)
+# Addresses that could not be geocoded are remembered briefly, so retries of a typo
+# answer 404 immediately instead of re-running every geocoder. Only the geocoder's definitive
+# no-match lands here; other 404s (e.g. missing ACS data) and upstream outages are never cached.
+_NOT_FOUND_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+# --- In-Flight Request Coalescing ---
+# Concurrent requests for the same address await the first request's future
+# instead of issuing their own Census and database lookups.
+_INFLIGHT: dict[str, asyncio.Future] = {}
+
+def _consume_exception(future: asyncio.Future) -> None:
+    """Marks a future's exception as retrieved so unawaited failures are not logged by asyncio."""
+    if not future.cancelled():
+        future.exception()
+
+# --- Cache Listing Pagination ---
+MAX_CACHE_PAGE_SIZE = 1000
+
+def _encode_cursor(last_address: str) -> str:
+    """Encodes the last address of a page into an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(last_address.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> str:
+    """Decodes a cursor produced by _encode_cursor, rejecting malformed values."""
+    try:
+        return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+async def _get_or_fetch_market_data(
+    address: str, service: CensusService, raw_pool: asyncpg.Pool, background_tasks: BackgroundTasks
+) -> bytes:
+    """
+    Resolves the serialized market data body from the in-process cache,
+    an in-flight request for the same address, the database cache, or the Census APIs.
+    Freshly fetched data is written to the database cache by background_tasks after the response.
+    """
+    cache_key = normalize_address(address)
+    cached_body = _ADDR_CACHE.get(cache_key)
+    if cached_body is not None:
+        logger.info("In-process cache HIT for '{}'.", address)
+        return cached_body
 
-def get_cache_manager(): return CacheManager()
-def get_data_processor(): return DataProcessor()
-def get_geocoding_service(): return GeocodingService(http_client)
-def get_census_api_client(): return CensusAPIClient(http_client)
+    not_found_detail = _NOT_FOUND_CACHE.get(cache_key)
+    if not_found_detail is not None:
+        logger.info("Not-found cache HIT for '{}'.", address)
+        raise HTTPException(status_code=404, detail=not_found_detail)
 
-# The main CensusService depends on the other services
-def get_census_service(
-    cache: CacheManager = Depends(get_cache_manager),
-    geocoder: GeocodingService = Depends(get_geocoding_service),
-    api_client: CensusAPIClient = Depends(get_census_api_client),
-    processor: DataProcessor = Depends(get_data_processor)
-) -> CensusService:
-    return CensusService(cache, geocoder, api_client, processor)
+    inflight = _INFLIGHT.get(cache_key)
+    if inflight is not None:
+        logger.info("Joining in-flight request for '{}'.", address)
+        # Shield the shared future so a disconnecting follower cannot cancel it for everyone else.
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(_consume_exception)
+    _INFLIGHT[cache_key] = future
+    try:
+        # Database cache hits are pre-serialized JSON, so they skip Pydantic validation and encoding.
+        body = await service.get_cached_market_data_body(address, raw_pool)
+        if body is None:
+            body = await service.get_market_data_body_for_address(address=address, conn=raw_pool, background=background_tasks)
+        _ADDR_CACHE[cache_key] = body
+        future.set_result(body)
+        logger.info("Successfully processed request for '{}'.", address)
+        return body
+    except HTTPException as e:
+        if isinstance(e, AddressNotGeocodedError):
+            _NOT_FOUND_CACHE[cache_key] = e.detail
+        future.set_exception(e)
+        logger.warning("HTTPException for '{}': Status={}, Detail='{}'.", address, e.status_code, e.detail)
+        raise e
+    except Exception:
+        logger.exception("An unexpected error occurred for '{}'.", address)
+        error = HTTPException(status_code=500, detail="An unexpected internal error occurred.")
+        future.set_exception(error)
+        raise error
+    finally:
+        if not future.done():
+            # The leading request was cancelled; release any waiters with a retryable error.
+            future.set_exception(HTTPException(status_code=503, detail="The request was interrupted. Please try again."))
+        _INFLIGHT.pop(cache_key, None)
 
 router = APIRouter()
 CensusServiceDep = Annotated[CensusService, Depends(get_census_service)]
 DBSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+RawPoolDep = Annotated[asyncpg.Pool, Depends(get_raw_pool)]
 
 @router.post(
     "/market-data",
@@ -54,29 +161,18 @@ async def get_market_data(
     fastapi_request: Request,
     request: MarketDataRequest,
     service: CensusServiceDep,
-    db_session: DBSessionDep,
+    raw_pool: RawPoolDep,
+    background_tasks: BackgroundTasks,
     current_user: dict = Security(get_current_user),
 ):
-    start_time = time.time()
-    client_host = fastapi_request.client.host if fastapi_request.client else "unknown"
-    logger.info(f"Received /market-data request from {client_host} for address: '{request.address}'")
-    
-    try:
-        result = await service.get_market_data_for_address(
-            address=request.address,
-            db=db_session
-        )
-        process_time = (time.time() - start_time) * 1000
-        logger.info(f"Successfully processed request for '{request.address}' in {process_time:.2f}ms.")
-        return result
-    except HTTPException as e:
-        process_time = (time.time() - start_time) * 1000
-        logger.warning(f"HTTPException for '{request.address}': Status={e.status_code}, Detail='{e.detail}'. Processed in {process_time:.2f}ms.")
-        raise e
-    except Exception:
-        process_time = (time.time() - start_time) * 1000
-        logger.exception(f"An unexpected error occurred for '{request.address}'. Processed in {process_time:.2f}ms.")
-        raise HTTPException(status_code=500, detail="An unexpected internal error occurred.")
+    # Log arguments are passed separately so loguru only formats them when INFO is enabled.
+    logger.info(
+        "Received /market-data request from {} for address: '{}'",
+        fastapi_request.client.host if fastapi_request.client else "unknown", request.address,
+    )
+
+    body = await _get_or_fetch_market_data(request.address, service, raw_pool, background_tasks)
+    return Response(content=body, media_type="application/json")
 
 @router.get(
     "/tract-geojson",
@@ -98,29 +194,39 @@ async def get_tract_geojson(
     """
     Provides the GeoJSON boundary for a specific census tract.
     """
-    logger.info(f"Received /tract-geojson request for state={state}, county={county}, tract={tract}")
+    logger.info("Received /tract-geojson request for state={}, county={}, tract={}", state, county, tract)
     return await service.get_tract_geojson(state, county, tract)
 
 
 @router.get(
     "/market-data/cache",
-    response_model=List[str],
-    summary="Get all cached addresses",
-    description="Retrieves a list of all addresses currently in the server-side cache.",
+    response_model=CachedAddressPage,
+    summary="Get cached addresses",
+    description="Retrieves a page of addresses currently in the server-side cache, sorted alphabetically.",
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid pagination cursor"},
+    },
 )
 async def get_all_cached_data(
     service: CensusServiceDep,
-    db_session: DBSessionDep,
+    raw_pool: RawPoolDep,
+    cursor: str | None = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(500, ge=1, le=MAX_CACHE_PAGE_SIZE, description="Maximum number of addresses to return"),
     current_user: dict = Security(get_current_user),
 ):
-    """Returns a list of all cached search addresses."""
-    logger.info("Received request to list all cached addresses.")
-    addresses = await service.get_all_cached_addresses(db=db_session)
-    return addresses
+    """Returns one keyset-paginated page of cached search addresses."""
+    logger.info("Received request to list cached addresses.")
+    after = _decode_cursor(cursor) if cursor else None
+    addresses, last_address = await service.list_cached_addresses(raw_pool, after=after, limit=limit)
+    return CachedAddressPage(
+        items=addresses,
+        next_cursor=_encode_cursor(last_address) if last_address is not None else None,
+    )
 
 @router.delete(
     "/market-data/cache",
     status_code=204,
+    response_class=Response,
     summary="Delete a cached address",
     description="Removes a specific address from the server-side cache.",
 )
@@ -131,6 +237,10 @@ async def delete_cached_data(
     current_user: dict = Security(get_current_user),
 ):
     """Deletes a cache entry for a given address."""
-    logger.info(f"Received request to delete cache for address: '{request.address}'")
+    logger.info("Received request to delete cache for address: '{}'", request.address)
     await service.delete_cache_for_address(address=request.address, db=db_session)
-    return Response(status_code=204)
\ No newline at end of file
+    cache_key = normalize_address(request.address)
+    _ADDR_CACHE.pop(cache_key, None)
+    _NOT_FOUND_CACHE.pop(cache_key, None)
+    # Returning None with status_code=204 yields an empty body without building a Response here.
+    return None
\ No newline at end of file
@@ -1,6 +1,6 @@
 import base64
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from functools import lru_cache
+from functools import cache, cached_property
 from loguru import logger
 
 class Settings(BaseSettings):
@@ -19,14 +19,61 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int
     POSTGRES_DB: str
 
+    # Optional PgBouncer (transaction pooling) in front of Postgres. When set, the app connects through it.
+    PGBOUNCER_HOST: str | None = None
+    PGBOUNCER_PORT: int = 6432
+
+    # Connection pool tuning for the async SQLAlchemy engine (kept small per worker, PgBouncer multiplexes)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: int = 5
+    DB_POOL_RECYCLE: int = 1800
+    # Prepared statements cached per connection (ignored behind PgBouncer, where caching is disabled)
+    DB_STATEMENT_CACHE_SIZE: int = 200
+    # Raw asyncpg pool for the read-only hot paths, on top of the SQLAlchemy pool. Without PgBouncer each
+    # worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_RAW_POOL_MAX_SIZE connections, which must stay
+    # under Postgres max_connections across all workers (4 x 20 = 80 of the default 100).
+    DB_RAW_POOL_MIN_SIZE: int = 2
+    DB_RAW_POOL_MAX_SIZE: int = 10
+
+    # Per-worker in-memory cache of serialized responses. Deletes only evict the local worker's
+    # copy, so the TTL bounds how long other workers may keep serving a removed entry.
+    RESPONSE_CACHE_MAXSIZE: int = 10_000
+    RESPONSE_CACHE_TTL: int = 3600
+
+    # Upper bound on concurrent upstream (Census, geocoder, Walk Score) connections per worker.
+    # The shared HTTP client's pool is the only limit on how many requests a cache miss fans out at once.
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+
     CENSUS_API_KEY: str
     GEOCODING_API_KEY: str | None = None
     WALKSCORE_API_KEY: str | None = None # Add this line
 
     @property
+    def USE_PGBOUNCER(self) -> bool:
+        """Whether database connections are routed through PgBouncer."""
+        return bool(self.PGBOUNCER_HOST)
+
+    def _async_database_url(self, host: str, port: int) -> str:
+        """Builds an asyncpg SQLAlchemy URL for the given host and port."""
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{host}:{port}/{self.POSTGRES_DB}"
+
+    @cached_property
     def DATABASE_URL(self) -> str:
-        """Constructs the full SQLAlchemy async database URL."""
-        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        """Constructs the full SQLAlchemy async database URL once per settings instance."""
+        if self.USE_PGBOUNCER:
+            return self._async_database_url(self.PGBOUNCER_HOST, self.PGBOUNCER_PORT)
+        return self.DIRECT_DATABASE_URL
+
+    @cached_property
+    def DIRECT_DATABASE_URL(self) -> str:
+        """Constructs the database URL that always bypasses PgBouncer, used for migrations and DDL."""
+        return self._async_database_url(self.POSTGRES_HOST, self.POSTGRES_PORT)
+
+    @cached_property
+    def ASYNCPG_DSN(self) -> str:
+        """Constructs the plain DSN used by the raw asyncpg pool."""
+        return self.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
 
     @property
     def FIREBASE_SERVICE_ACCOUNT_JSON(self) -> str | None:
@@ -42,15 +89,13 @@ class Settings(BaseSettings):
         extra='ignore'
     )
 
-@lru_cache()
+@cache
 def get_settings() -> Settings:
     """Returns the settings instance, cached for efficiency."""
     logger.info("Loading application settings...")
     try:
         settings = Settings()
         logger.info("Application settings loaded successfully.")
-        # Be careful not to log sensitive data like passwords
-        logger.debug(f"Settings loaded: ENVIRONMENT={settings.ENVIRONMENT}, LOG_LEVEL={settings.LOG_LEVEL}")
         return settings
     except Exception as e:
         logger.critical(f"FATAL: Failed to load application settings: {e}")
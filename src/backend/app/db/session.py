@@ -1,17 +1,49 @@
+from uuid import uuid4
+
+import asyncpg
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from loguru import logger
 
 from app.core.config import settings
 
+# Repeated cache lookups reuse prepared statements instead of being parsed and planned
+# on every call, and JIT is disabled because it only adds warm-up cost to tiny OLTP queries.
+# PgBouncer rejects unknown startup parameters, so behind it no server settings are sent and
+# JIT is turned off on the Postgres server itself (see docker-compose.yaml).
+DB_SERVER_SETTINGS = {} if settings.USE_PGBOUNCER else {"jit": "off"}
+
+# PgBouncer's transaction pooling hands a different server connection to each transaction,
+# so named prepared statements cannot be cached and must have unique names.
+STATEMENT_CACHE_SIZE = 0 if settings.USE_PGBOUNCER else settings.DB_STATEMENT_CACHE_SIZE
+ENGINE_CONNECT_ARGS = {
+    "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+    "statement_cache_size": STATEMENT_CACHE_SIZE,
+    "server_settings": DB_SERVER_SETTINGS,
+}
+if settings.USE_PGBOUNCER:
+    ENGINE_CONNECT_ARGS["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+
 logger.info("Creating database engine...")
-# Create an async engine instance. pool_pre_ping=True helps manage stale connections.
+# Create an async engine instance. The explicit pool sizing absorbs request bursts instead of
+# queueing on the default 5. Stale connections are handled by pool_recycle plus a single retry
+# on disconnect in the cache layer, instead of a pre-ping round-trip on every checkout.
 try:
-    engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True, echo=False)
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=False,
+        echo=False,
+        connect_args=ENGINE_CONNECT_ARGS,
+    )
     # Log connection details without credentials for security
     db_connection_info = (
         f"DB Engine created for "
-        f"host='{settings.POSTGRES_HOST}', "
-        f"port='{settings.POSTGRES_PORT}', "
+        f"host='{settings.PGBOUNCER_HOST if settings.USE_PGBOUNCER else settings.POSTGRES_HOST}', "
+        f"port='{settings.PGBOUNCER_PORT if settings.USE_PGBOUNCER else settings.POSTGRES_PORT}', "
         f"database='{settings.POSTGRES_DB}'"
     )
     logger.info(db_connection_info)
@@ -39,7 +71,33 @@ async def get_db_session() -> AsyncSession:
             yield session
             logger.debug("Database session committed and closed successfully.")
         except Exception as e:
-            logger.error(f"An exception occurred during database session: {e}")
+            logger.error("An exception occurred during database session: {}", e)
             await session.rollback()
             logger.warning("Database session rolled back due to exception.")
             raise
+
+
+async def create_raw_pool() -> asyncpg.Pool:
+    """
+    Creates the shared asyncpg pool used by read-only hot paths that bypass the ORM.
+    """
+    logger.info("Creating raw asyncpg connection pool...")
+    pool = await asyncpg.create_pool(
+        dsn=settings.ASYNCPG_DSN,
+        min_size=settings.DB_RAW_POOL_MIN_SIZE,
+        max_size=settings.DB_RAW_POOL_MAX_SIZE,
+        command_timeout=60,
+        statement_cache_size=STATEMENT_CACHE_SIZE,
+        server_settings=DB_SERVER_SETTINGS,
+    )
+    logger.info("Raw asyncpg connection pool created.")
+    return pool
+
+
+def get_raw_pool(request: Request) -> asyncpg.Pool:
+    """
+    FastAPI dependency that returns the shared asyncpg pool.
+    Queries run directly on the pool only hold a connection for the duration of the query.
+    """
+    return request.app.state.pg_pool
+
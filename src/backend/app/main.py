@@ -1,9 +1,14 @@
-from fastapi import FastAPI
+import os
+import time
+
+from fastapi import FastAPI, Request
 from loguru import logger
 
 from app.api.v1 import endpoints
+from app.api.deps import shutdown_auth_executor
 from app.core.firebase import initialize_firebase
 from app.core.logging_config import setup_logging
+from app.db.session import create_raw_pool
 
 # --- Logging Setup ---
 # This must be called BEFORE the app is created to ensure
@@ -22,10 +27,32 @@ app = FastAPI(
 async def startup_event():
     logger.info("Application startup...")
     initialize_firebase()
+    app.state.pg_pool = await create_raw_pool()
+    app.state.http_client = endpoints.create_http_client()
+    app.state.census_service = endpoints.create_census_service(app.state.http_client, app.state.pg_pool)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown.")
+    await app.state.http_client.aclose()
+    await app.state.pg_pool.close()
+    shutdown_auth_executor()
+
+# --- Middleware ---
+@app.middleware("http")
+async def log_request_timing(request: Request, call_next):
+    """Measures and logs the processing time of every request in one place."""
+    # perf_counter_ns is monotonic (immune to wall-clock adjustments) and stays an integer.
+    start = time.perf_counter_ns()
+    response = await call_next(request)
+    elapsed_ns = time.perf_counter_ns() - start
+    # With lazy=True, the millisecond conversion and formatting only run if INFO is enabled.
+    logger.opt(lazy=True).info(
+        "{} {} completed with status {} in {:.2f}ms",
+        lambda: request.method, lambda: request.url.path, lambda: response.status_code,
+        lambda: elapsed_ns / 1_000_000,
+    )
+    return response
 
 # --- Router Inclusion ---
 # Include the router from our endpoints module
@@ -39,3 +66,16 @@ async def read_root():
     """A simple health check endpoint."""
     logger.debug("Health check endpoint '/' was hit.")
     return {"status": "ok", "message": "Welcome to the CapMatch API"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=5000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", 4)),
+    )
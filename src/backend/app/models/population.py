@@ -1,18 +1,72 @@
 # src/backend/app/models/population.py
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, LargeBinary, String, JSON, DateTime, text
 from sqlalchemy.sql import func
 from app.db.db_base_class import Base
 
 class PopulationCache(Base):
     """SQLAlchemy model for the population data cache."""
     __tablename__ = "population_cache"
+    __table_args__ = (
+        # Expression index backing the keyset-paginated cached address listing.
+        Index("ix_population_cache_search_address", text("(response_data->>'search_address')")),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # The primary key constraint already provides the id index.
+    id = Column(Integer, primary_key=True)
     # A normalized version of the address to act as the cache key.
     address_key = Column(String, unique=True, index=True, nullable=False)
-    # The full JSON response from the service, stored for quick retrieval.
+    # A signed 64-bit BLAKE2b hash of the address key for fixed-size index probes.
+    address_hash = Column(BigInteger, index=True, nullable=False)
+    # The full JSON response from the service, stored for querying.
     response_data = Column(JSON, nullable=False)
+    # The same response pre-serialized to JSON bytes, returned verbatim on cache hits.
+    body_bytes = Column(LargeBinary, nullable=False)
     # Timestamp for when the record was created.
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     # Timestamp for when the record was last updated.
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class GeocodeCache(Base):
+    """SQLAlchemy model for cached geocoding results, reused when a response has to be rebuilt."""
+    __tablename__ = "geocode_cache"
+
+    # The normalized address, shared with the population cache key.
+    address_key = Column(String, primary_key=True)
+    # FIPS codes of the census tract the address geocoded to.
+    state_fips = Column(String(2), nullable=False)
+    county_fips = Column(String(3), nullable=False)
+    tract_fips = Column(String(6), nullable=False)
+    # Coordinates of the geocoder match.
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    # Land area of the tract in square meters.
+    aland = Column(BigInteger, nullable=False)
+    # Timestamp for when the record was last updated, used to expire old geocodes.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class BenchmarkTrendCache(Base):
+    """SQLAlchemy model for benchmark population trends shared by every address in a geography."""
+    __tablename__ = "benchmark_trend_cache"
+
+    # The benchmark geography, e.g. 'county' with its state+county FIPS as the key.
+    geo_level = Column(String, primary_key=True)
+    geo_key = Column(String, primary_key=True)
+    # The span of ACS years the trend covers.
+    start_year = Column(Integer, primary_key=True)
+    end_year = Column(Integer, primary_key=True)
+    # The trend points as a JSON array of {"year", "population"} objects.
+    trend = Column(JSON, nullable=False)
+    # Timestamp for when the trend was last fetched, used to refresh it periodically.
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class UpstreamRateLimit(Base):
+    """SQLAlchemy model for upstream rate limits shared by every worker process."""
+    __tablename__ = "upstream_rate_limit"
+
+    # The rate-limited upstream, e.g. 'nominatim'.
+    name = Column(String, primary_key=True)
+    # The earliest time the next request to the upstream may start.
+    next_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,15 +1,40 @@
-from pydantic import BaseModel, Field
+import re
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional, Literal, Union
 
 # --- Request and Foundational Schemas (Largely Unchanged) ---
+# Request payloads are small, immutable and single-field, so they use a strict, frozen config.
+REQUEST_MODEL_CONFIG = ConfigDict(str_strip_whitespace=True, frozen=True, extra='forbid')
+
+# Cheap shape check for U.S. addresses, so malformed input is rejected before any geocoding or Census I/O.
+ADDRESS_RE = re.compile(r"^[\w .,#&'\-/]{5,200}$")
+
 class MarketDataRequest(BaseModel):
     """Schema for the incoming market data POST request."""
+    model_config = REQUEST_MODEL_CONFIG
+
     address: str = Field(..., description="A full U.S. address.")
 
+    @field_validator('address')
+    @classmethod
+    def validate_address_shape(cls, value: str) -> str:
+        """Requires a plausibly sized string made only of characters that appear in addresses."""
+        if not ADDRESS_RE.match(value):
+            raise ValueError("Please provide a full U.S. address, e.g. '555 California St, San Francisco, CA'.")
+        return value
+
 class CacheDeleteRequest(BaseModel):
     """Schema for the cache deletion request."""
+    model_config = REQUEST_MODEL_CONFIG
+
     address: str = Field(..., description="The exact address to remove from the cache.")
 
+class CachedAddressPage(BaseModel):
+    """A keyset-paginated page of cached addresses."""
+    items: List[str]
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page, or null on the last page.")
+
 class PopulationTrendPoint(BaseModel):
     year: int
     population: int
@@ -80,12 +105,12 @@ class PopulationTrend(BaseModel):
 
 class AgeDistribution(BaseModel):
     """Schema for the age distribution data."""
+    model_config = ConfigDict(populate_by_name=True)
+
     under_18: ValueWithMoe
     age_18_to_34: ValueWithMoe = Field(..., alias="_18_to_34")
     age_35_to_64: ValueWithMoe = Field(..., alias="_35_to_64")
     over_65: ValueWithMoe
-    class Config:
-        populate_by_name = True
 
 
 class SexDistribution(BaseModel):
@@ -138,6 +163,8 @@ class HousingMetrics(BaseModel):
 # --- Main Response Schema (Heavily Modified) ---
 class PopulationDataResponse(BaseModel):
     """Final schema for the growth-focused market data response."""
+    model_config = ConfigDict(populate_by_name=True)
+
     search_address: str
     data_year: int
     geography_name: str
@@ -176,6 +203,3 @@ class PopulationDataResponse(BaseModel):
 
     # Trend Data
     population_trends: PopulationTrend
-
-    class Config:
-        populate_by_name = True
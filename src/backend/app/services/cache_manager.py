@@ -1,93 +1,320 @@
-import re
-import json
-from typing import List, Optional
+from functools import wraps
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from sqlalchemy import select, delete
+import asyncpg
+import orjson
+from cachetools import LRUCache
+from sqlalchemy import JSON, Text, cast, delete, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import ValidationError
 from loguru import logger
 
-from app.models.population import PopulationCache
-from app.schemas.population import PopulationDataResponse
+from app.models.population import PopulationCache, GeocodeCache, BenchmarkTrendCache
+from app.schemas.population import FipsCode, PopulationTrendPoint
+
+# Read-only queries run on the raw asyncpg pool to skip ORM session overhead on the hot path.
+# Lookups probe the fixed-size hash index first; the key comparison guards against collisions.
+# The body is stored pre-serialized, so a hit is returned to the client as-is.
+GET_CACHED_BODY_SQL = "SELECT body_bytes FROM population_cache WHERE address_hash = $1 AND address_key = $2"
+# Keyset pagination over the search_address expression index: each page is an index
+# range probe starting after the last address of the previous page, never an OFFSET scan.
+LIST_CACHED_ADDRESSES_SQL = (
+    "SELECT DISTINCT response_data->>'search_address' AS search_address "
+    "FROM population_cache ORDER BY search_address LIMIT $1"
+)
+LIST_CACHED_ADDRESSES_AFTER_SQL = (
+    "SELECT DISTINCT response_data->>'search_address' AS search_address "
+    "FROM population_cache WHERE response_data->>'search_address' > $2 "
+    "ORDER BY search_address LIMIT $1"
+)
+# Tract assignments practically never change, so geocodes are reused for a year.
+GET_CACHED_GEOCODE_SQL = (
+    "SELECT state_fips, county_fips, tract_fips, lat, lon, aland FROM geocode_cache "
+    "WHERE address_key = $1 AND updated_at > now() - interval '365 days'"
+)
+# Benchmark trends are refreshed yearly, matching the ACS release cadence.
+GET_BENCHMARK_TREND_SQL = (
+    "SELECT trend FROM benchmark_trend_cache "
+    "WHERE geo_level = $1 AND geo_key = $2 AND start_year = $3 AND end_year = $4 "
+    "AND refreshed_at > now() - interval '365 days'"
+)
+
+RawConnection = Union[asyncpg.Connection, asyncpg.Pool]
+
+# Joiners kept inside a token, so "12-34" and "1/2" stay distinct from "1234" and "12".
+_TOKEN_JOINERS = "-/"
+_SPACE = ord(" ")
+
+def _punct_translation(codepoint: int) -> int:
+    """Keeps word characters (alphanumerics and '_'), whitespace and token joiners, and turns other punctuation into a space."""
+    char = chr(codepoint)
+    return codepoint if (char.isalnum() or char == "_" or char.isspace() or char in _TOKEN_JOINERS) else _SPACE
+
+class _PunctSpaceTable(dict):
+    """
+    str.translate table that replaces punctuation with spaces. Code points are classified on
+    first sight and memoized, so translate stays in C for every character it has already seen.
+    """
+    MAX_MEMOIZED = 4096
+
+    def __missing__(self, codepoint: int) -> int:
+        result = _punct_translation(codepoint)
+        # Bounded so unusual input cannot grow the table without limit.
+        if len(self) < self.MAX_MEMOIZED:
+            self[codepoint] = result
+        return result
+
+# Pre-populated with ASCII, the common case, so typical addresses never leave C.
+_PUNCT_SPACE_TABLE = _PunctSpaceTable({codepoint: _punct_translation(codepoint) for codepoint in range(128)})
+
+def normalize_address(address: str) -> str:
+    """
+    Normalizes an address (lowercase, punctuation as word breaks, single spaces).
+    Shared by the in-process and database cache tiers so both agree on keys.
+    """
+    # Joiners only matter between characters; stray ones ("Main St - Apt 4") are dropped.
+    tokens = (token.strip(_TOKEN_JOINERS) for token in address.lower().translate(_PUNCT_SPACE_TABLE).split())
+    return " ".join(token for token in tokens if token)
+
+def hash_cache_key(cache_key: str) -> int:
+    """Hashes a cache key to a signed 64-bit integer that fits a BIGINT column."""
+    return int.from_bytes(blake2b(cache_key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+def _is_disconnect(error: Exception) -> bool:
+    """Checks whether an error was caused by a dropped database connection."""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated
+    return isinstance(error, (asyncpg.exceptions.ConnectionDoesNotExistError, asyncpg.exceptions.InterfaceError, ConnectionError))
+
+def retry_on_disconnect(func):
+    """
+    Retries a database operation once if its connection was dropped (e.g. closed while idle).
+    This replaces a pre-ping round-trip on every pool checkout. Any AsyncSession argument
+    is rolled back first so it can be reused.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if not _is_disconnect(e):
+                raise
+            logger.warning("Database connection lost during '{}', retrying once. Error: {}", func.__name__, e)
+            for arg in (*args, *kwargs.values()):
+                if isinstance(arg, AsyncSession):
+                    await arg.rollback()
+            return await func(*args, **kwargs)
+    return wrapper
 
 class CacheManager:
     """Handles all database interactions for caching market data."""
 
+    def __init__(self):
+        # Process-local layer in front of geocode_cache; geocodes are tiny and effectively immutable.
+        self._geocodes: LRUCache = LRUCache(maxsize=1024)
+        # Same for benchmark_trend_cache: every address in a county shares its county trend.
+        self._benchmark_trends: LRUCache = LRUCache(maxsize=1024)
+
     def _generate_cache_key(self, address: str) -> str:
         """Generates a consistent, normalized cache key for an address."""
-        normalized_address = re.sub(r'\s+', ' ', address).strip().lower()
         # Versioning the cache key is good practice for when the response schema changes.
-        return f"{normalized_address}|tract|5_year_projected_v3"
+        return f"{normalize_address(address)}|tract|5_year_projected_v5"
 
-    async def get_cached_response(self, address: str, db: AsyncSession) -> Optional[PopulationDataResponse]:
+    @retry_on_disconnect
+    async def get_cached_body(self, address: str, conn: RawConnection) -> Optional[bytes]:
         """
-        Retrieves and validates a cached response from the database.
-        Returns None if not found or if data is invalid.
+        Retrieves the pre-serialized JSON body of a cached response using a raw asyncpg connection.
+        Returns None if not found. The versioned cache key guarantees the body matches the current schema.
         """
         cache_key = self._generate_cache_key(address)
-        logger.info(f"Checking cache for key: {cache_key}")
+        logger.info("Checking cache for key: {}", cache_key)
 
-        stmt = select(PopulationCache).where(PopulationCache.address_key == cache_key)
-        result = await db.execute(stmt)
-        cached_data = result.scalars().first()
+        cached_body = await conn.fetchval(GET_CACHED_BODY_SQL, hash_cache_key(cache_key), cache_key)
 
-        if not cached_data:
-            logger.info(f"Cache MISS for key: {cache_key}")
+        if cached_body is None:
+            logger.info("Cache MISS for key: {}", cache_key)
             return None
 
-        try:
-            # Validate the cached JSON against the current Pydantic model.
-            # This prevents serving stale data if the schema has changed.
-            validated_response = PopulationDataResponse.model_validate(cached_data.response_data)
-            logger.success(f"Cache HIT and validation successful for key: {cache_key}")
-            return validated_response
-        except ValidationError as e:
-            logger.warning(f"Cache data for key '{cache_key}' is invalid. Refetching will be required. Error: {e}")
-            # The data is corrupt or outdated, so we treat it as a cache miss.
-            return None
+        logger.success("Cache HIT for key: {}", cache_key)
+        return cached_body
 
-    async def set_cached_response(self, address: str, response_data: PopulationDataResponse, db: AsyncSession) -> None:
-        """Saves a new response to the cache."""
+    @retry_on_disconnect
+    async def set_cached_response(self, address: str, body_bytes: bytes, db: AsyncSession) -> None:
+        """Saves a serialized response body to the cache, replacing any existing entry for the address."""
         cache_key = self._generate_cache_key(address)
-        logger.info(f"Saving new data to cache with key: {cache_key}")
-        
-        # The response_data is a Pydantic model, so we need to dump it to a dict
-        # that can be serialized to JSON.
-        response_dict = json.loads(response_data.model_dump_json(by_alias=True))
+        logger.info("Saving new data to cache with key: {}", cache_key)
+
+        # The rendered JSON body is stored for serving hits, and the same text is cast to the JSON
+        # column for querying (e.g. listing addresses). Postgres parses it server-side, so no
+        # Python dict is built and re-serialized here.
+        body = body_bytes.decode("utf-8")
 
-        new_cache_entry = PopulationCache(
+        # A single UPSERT: concurrent misses for the same address (e.g. in different workers)
+        # overwrite each other instead of failing on the unique address_key constraint.
+        stmt = pg_insert(PopulationCache).values(
             address_key=cache_key,
-            response_data=response_dict
+            address_hash=hash_cache_key(cache_key),
+            body_bytes=body_bytes,
+            response_data=cast(literal(body, Text), JSON),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PopulationCache.address_key],
+            set_={
+                "address_hash": stmt.excluded.address_hash,
+                "body_bytes": stmt.excluded.body_bytes,
+                "response_data": stmt.excluded.response_data,
+                "updated_at": func.now(),
+            },
         )
-        db.add(new_cache_entry)
+        await db.execute(stmt)
         await db.commit()
-        logger.success(f"Successfully saved data to cache for key: {cache_key}")
-
-    async def get_all_cached_addresses(self, db: AsyncSession) -> List[str]:
-        """Retrieves a distinct list of all user-facing addresses from the cache."""
-        logger.info("Fetching all cached addresses from the database.")
-        
-        # JSONB query to extract the 'search_address' field from the response_data column.
-        address_column = PopulationCache.response_data['search_address'].as_string().label("search_address")
-        
-        stmt = select(address_column).distinct().order_by(address_column)
-        
-        result = await db.execute(stmt)
-        addresses = result.scalars().all()
-        
-        logger.success(f"Found {len(addresses)} unique cached addresses.")
-        return addresses
+        logger.success("Successfully saved data to cache for key: {}", cache_key)
+
+    @retry_on_disconnect
+    async def get_cached_geocode(self, address: str, conn: RawConnection) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves a previously stored geocoding result using a raw asyncpg connection.
+        Returns None if the address was never geocoded or its geocode has expired.
+        """
+        address_key = normalize_address(address)
+        geo_info = self._geocodes.get(address_key)
+        if geo_info is not None:
+            logger.info("In-process geocode cache HIT for key: {}", address_key)
+            return geo_info
+
+        row = await conn.fetchrow(GET_CACHED_GEOCODE_SQL, address_key)
 
+        if row is None:
+            logger.info("Geocode cache MISS for key: {}", address_key)
+            return None
+
+        logger.success("Geocode cache HIT for key: {}", address_key)
+        # The row was written from an already validated FipsCode, so it is constructed without revalidation.
+        geo_info = {
+            "fips": FipsCode.model_construct(state=row["state_fips"], county=row["county_fips"], tract=row["tract_fips"]),
+            "coords": {"lat": row["lat"], "lon": row["lon"]},
+            "aland": row["aland"],
+        }
+        self._geocodes[address_key] = geo_info
+        return geo_info
+
+    @retry_on_disconnect
+    async def set_cached_geocode(self, address: str, geo_info: Dict[str, Any], db: AsyncSession) -> None:
+        """Saves a geocoding result, replacing any existing entry for the address."""
+        address_key = normalize_address(address)
+        fips, coords = geo_info["fips"], geo_info["coords"]
+
+        stmt = pg_insert(GeocodeCache).values(
+            address_key=address_key,
+            state_fips=fips.state,
+            county_fips=fips.county,
+            tract_fips=fips.tract,
+            lat=coords["lat"],
+            lon=coords["lon"],
+            aland=geo_info["aland"],
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GeocodeCache.address_key],
+            set_={
+                "state_fips": stmt.excluded.state_fips,
+                "county_fips": stmt.excluded.county_fips,
+                "tract_fips": stmt.excluded.tract_fips,
+                "lat": stmt.excluded.lat,
+                "lon": stmt.excluded.lon,
+                "aland": stmt.excluded.aland,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        await db.commit()
+        self._geocodes[address_key] = geo_info
+        logger.info("Saved geocode to cache for key: {}", address_key)
+
+    @retry_on_disconnect
+    async def get_cached_benchmark_trend(
+        self, geo_level: str, geo_key: str, start_year: int, end_year: int, conn: RawConnection
+    ) -> Optional[List[PopulationTrendPoint]]:
+        """Retrieves a stored benchmark trend using a raw asyncpg connection. Returns None if absent or stale."""
+        trend_key = (geo_level, geo_key, start_year, end_year)
+        trend = self._benchmark_trends.get(trend_key)
+        if trend is not None:
+            return trend
+
+        trend_json = await conn.fetchval(GET_BENCHMARK_TREND_SQL, geo_level, geo_key, start_year, end_year)
+
+        if trend_json is None:
+            logger.info("Benchmark trend cache MISS for {} {} ({}-{})", geo_level, geo_key, start_year, end_year)
+            return None
+
+        logger.success("Benchmark trend cache HIT for {} {} ({}-{})", geo_level, geo_key, start_year, end_year)
+        # Stored points were validated before they were written.
+        trend = [PopulationTrendPoint.model_construct(**point) for point in orjson.loads(trend_json)]
+        self._benchmark_trends[trend_key] = trend
+        return trend
+
+    @retry_on_disconnect
+    async def set_cached_benchmark_trend(
+        self, geo_level: str, geo_key: str, start_year: int, end_year: int,
+        trend: List[PopulationTrendPoint], db: AsyncSession,
+    ) -> None:
+        """Saves a benchmark trend, replacing any existing (stale) entry for the same geography and years."""
+        trend_json = orjson.dumps([{"year": point.year, "population": point.population} for point in trend]).decode("utf-8")
+
+        stmt = pg_insert(BenchmarkTrendCache).values(
+            geo_level=geo_level,
+            geo_key=geo_key,
+            start_year=start_year,
+            end_year=end_year,
+            trend=cast(literal(trend_json, Text), JSON),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                BenchmarkTrendCache.geo_level, BenchmarkTrendCache.geo_key,
+                BenchmarkTrendCache.start_year, BenchmarkTrendCache.end_year,
+            ],
+            set_={"trend": stmt.excluded.trend, "refreshed_at": func.now()},
+        )
+        await db.execute(stmt)
+        await db.commit()
+        self._benchmark_trends[(geo_level, geo_key, start_year, end_year)] = trend
+        logger.info("Saved benchmark trend to cache for {} {} ({}-{})", geo_level, geo_key, start_year, end_year)
+
+    @retry_on_disconnect
+    async def list_cached_addresses(
+        self, conn: RawConnection, after: Optional[str], limit: int
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Retrieves one page of distinct user-facing addresses from the cache, sorted alphabetically.
+        Returns the page and the last address on it if more pages follow, otherwise None.
+        """
+        logger.info("Fetching a page of up to {} cached addresses.", limit)
+        # Fetch one extra row to find out whether another page exists.
+        if after is None:
+            rows = await conn.fetch(LIST_CACHED_ADDRESSES_SQL, limit + 1)
+        else:
+            rows = await conn.fetch(LIST_CACHED_ADDRESSES_AFTER_SQL, limit + 1, after)
+
+        addresses = [row["search_address"] for row in rows[:limit]]
+        last_address = addresses[-1] if len(rows) > limit else None
+        logger.success("Found {} cached addresses on this page.", len(addresses))
+        return addresses, last_address
+
+    @retry_on_disconnect
     async def delete_cache_for_address(self, address: str, db: AsyncSession) -> None:
         """Deletes a cache entry for a specific address."""
         cache_key = self._generate_cache_key(address)
-        logger.info(f"Attempting to delete cache entry for key: {cache_key}")
+        logger.info("Attempting to delete cache entry for key: {}", cache_key)
 
-        stmt = delete(PopulationCache).where(PopulationCache.address_key == cache_key)
+        stmt = delete(PopulationCache).where(
+            PopulationCache.address_hash == hash_cache_key(cache_key),
+            PopulationCache.address_key == cache_key,
+        )
         result = await db.execute(stmt)
         await db.commit()
 
         if result.rowcount > 0:
-            logger.success(f"Successfully deleted {result.rowcount} cache entry for key: {cache_key}")
+            logger.success("Successfully deleted {} cache entry for key: {}", result.rowcount, cache_key)
         else:
-            logger.warning(f"No cache entry found for key '{cache_key}' to delete.")
\ No newline at end of file
+            logger.warning("No cache entry found for key '{}' to delete.", cache_key)
\ No newline at end of file
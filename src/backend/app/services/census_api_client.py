@@ -1,20 +1,32 @@
 import asyncio
-from typing import Dict, List, Any, Literal, Optional
-from httpx import AsyncClient, HTTPStatusError
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from typing import Dict, List, Any, Literal, Optional, Sequence
+import orjson
+from cachetools import TTLCache
+from httpx import AsyncClient, HTTPStatusError, Response, TransportError
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 from fastapi import HTTPException
 from loguru import logger
 
-from app.schemas.population import FipsCode
+from app.schemas.population import FipsCode, PopulationTrendPoint
 from app.core.config import settings
 
 LATEST_PEP_YEAR = 2019 # NOTE: PEP data is not updated as frequently as ACS
+PEP_POP_VARS = ("POP",)
+PEP_COMPONENT_VARS = ("BIRTHS", "DEATHS", "DOMESTICMIG", "INTERNATIONALMIG", "NATURALINC")
 
-# Define a retry strategy for network-related or server-side errors
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a failed upstream request may succeed on retry (server errors, rate limiting, network failures)."""
+    if isinstance(error, HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, TransportError)
+
+# Define a retry strategy for network-related or server-side errors. Other client errors and
+# malformed responses fail immediately instead of waiting out the backoff on the critical path.
 retry_strategy = retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((HTTPStatusError, HTTPException)),
+    retry=retry_if_exception(is_transient_error),
+    reraise=True,
 )
 
 
@@ -26,29 +38,43 @@ class CensusAPIClient:
     def __init__(self, http_client: AsyncClient):
         self.http_client = http_client
         self.api_key = settings.CENSUS_API_KEY
+        # Census datasets only change with a new release, so a response for the same URL and
+        # parameters (e.g. a county's PEP components, shared by every address in the county)
+        # is reused in-process for a day instead of being fetched again.
+        self._responses: TTLCache = TTLCache(maxsize=4096, ttl=24 * 3600)
 
     @retry_strategy
+    async def _get(self, url: str, params: Dict[str, Any]) -> Response:
+        """Issues a GET request, retrying transient failures."""
+        response = await self.http_client.get(url, params=params)
+        response.raise_for_status()
+        return response
+
     async def _make_request(self, url: str, params: Dict[str, Any]) -> List[List[Any]]:
-        """A generic, retryable method to make requests to the Census API."""
+        """A generic method to make requests to the Census API. Successful responses are cached in-process."""
+        cache_key = (url, tuple(params.items()))
+        cached = self._responses.get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            response = await self.http_client.get(url, params=params)
-            response.raise_for_status()
+            response = await self._get(url, params)
 
             # Handle 204 No Content response from Census API, which indicates no data is available.
             if response.status_code == 204:
-                logger.warning(f"Census API returned 204 No Content for {response.request.url}, indicating no data available.")
-                return []
-
-            data = response.json()
-            if not data or len(data) < 2:
-                return []
+                logger.warning("Census API returned 204 No Content for {}, indicating no data available.", response.request.url)
+                data = []
+            else:
+                data = orjson.loads(response.content)
+                if not data or len(data) < 2:
+                    data = []
+            self._responses[cache_key] = data
             return data
         except HTTPStatusError as e:
-            logger.error(f"HTTP error calling Census API at {e.request.url}: {e.response.status_code}")
+            logger.error("HTTP error calling Census API at {}: {}", e.request.url, e.response.status_code)
             # Re-raise as HTTPException to be handled by FastAPI's error handling
             raise HTTPException(status_code=503, detail=f"Census API service is unavailable: {e.response.status_code}")
         except Exception as e:
-            logger.error(f"An unexpected error occurred during Census API request: {e}")
+            logger.error("An unexpected error occurred during Census API request: {}", e)
             raise HTTPException(status_code=500, detail="An internal error occurred while contacting the Census API.")
 
     def _get_geo_params(self, fips: FipsCode, geo_level: str) -> Dict[str, str]:
@@ -66,6 +92,13 @@ class CensusAPIClient:
         """
         if value is None:
             return None
+        if isinstance(value, str):
+            # Most values are integer strings, which int() parses directly without a float round trip.
+            try:
+                num = int(value)
+                return num if num >= 0 else None
+            except ValueError:
+                pass
         try:
             num = float(value)
             if num < 0:  # Census API uses negative values for missing/suppressed data
@@ -81,7 +114,7 @@ class CensusAPIClient:
         fips: FipsCode,
         year: int,
         geo_level: Literal['tract', 'county'],
-        variables: List[str],
+        variables: Sequence[str],
         endpoint: Literal["acs/acs5", "acs/acs5/subject", "acs/acs5/profile"] = "acs/acs5"
     ) -> Dict[str, Any]:
         base_url = f"https://api.census.gov/data/{year}/{endpoint}"
@@ -92,7 +125,7 @@ class CensusAPIClient:
         }
 
         logger.info(
-            f"Fetching {endpoint} data for year {year}, geo: {geo_level}, fips: {fips.state}{fips.county}, vars: {len(variables)}"
+            "Fetching {} data for year {}, geo: {}, fips: {}{}, vars: {}", endpoint, year, geo_level, fips.state, fips.county, len(variables)
         )
 
         data = await self._make_request(base_url, params)
@@ -102,35 +135,77 @@ class CensusAPIClient:
             # with partial data, which is crucial for historical trend analysis.
             return {}
         header, values = data[0], data[1]
+        parse = self._parse_census_value
+        count = len(variables)
+
+        # Columns come back in the order requested ('NAME', *variables, then geography columns),
+        # so values are read by position; the header is matched by name only if it ever differs.
+        if header[1:count + 1] == list(variables):
+            processed_data = dict(zip(variables, map(parse, values[1:count + 1])))
+            processed_data['NAME'] = values[0]
+            return processed_data
 
-        # Create a dictionary with raw string values first
+        # Keep 'NAME' as a string and parse only the actual census variables as numbers
         raw_data = dict(zip(header, values))
+        get = raw_data.get
+        processed_data = {var: parse(get(var)) for var in variables}
+        processed_data['NAME'] = get('NAME')
+        return processed_data
 
-        processed_data = {}
-        # Handle the 'NAME' field separately to keep it as a string
-        processed_data['NAME'] = raw_data.get('NAME')
+    async def fetch_population_trend(
+        self, fips: FipsCode, geo_level: Literal['tract', 'county'], years: List[int]
+    ) -> List[PopulationTrendPoint]:
+        """
+        Fetches total population (B01003_001E) for each of the given ascending years.
+        ACS 5-year tables have no multi-year endpoint, so the per-year requests are issued
+        concurrently, requesting only the one variable, and each row array is read directly.
+        Years without data are omitted.
+        """
+        logger.info("Fetching population trend for {} years, geo: {}, fips: {}{}", len(years), geo_level, fips.state, fips.county)
+        geo_params = self._get_geo_params(fips, geo_level)
+        responses = await asyncio.gather(*(
+            self._make_request(
+                f"https://api.census.gov/data/{year}/acs/acs5",
+                {"get": "B01003_001E", **geo_params, "key": self.api_key},
+            )
+            for year in years
+        ))
 
-        # Now, parse only the actual census variables as numbers
-        for var in variables:
-            processed_data[var] = self._parse_census_value(raw_data.get(var))
-        return processed_data
+        trend = []
+        for year, rows in zip(years, responses):
+            # rows[0] is the header; the requested variable is the first column of the data row.
+            population = self._parse_census_value(rows[1][0]) if rows else None
+            if population:
+                # Population counts parse to ints, so the points are constructed without revalidation.
+                trend.append(PopulationTrendPoint.model_construct(year=year, population=population))
+        return trend
 
     async def fetch_large_acs_dataset(
-        self, fips: FipsCode, year: int, geo_level: str, all_vars: List[str]
+        self, fips: FipsCode, year: int, geo_level: str, all_vars: Sequence[str]
     ) -> Dict[str, Any]:
         """Fetches a large number of ACS variables by splitting them into multiple requests."""
         merged_results = {}
-        # Census API variable limit is around 50
-        chunk_size = 45
-        for i in range(0, len(all_vars), chunk_size):
-            chunk = all_vars[i:i + chunk_size]
-            try:
-                result = await self.fetch_acs_data(fips, year, geo_level, chunk)
-                if result:
-                    merged_results.update(result)
-            except HTTPException as e:
+        failed_chunks = 0
+        # The Census API allows 50 variables per request, and NAME is always requested alongside
+        chunk_size = 49
+        chunks = [all_vars[i:i + chunk_size] for i in range(0, len(all_vars), chunk_size)]
+        # The chunks are independent requests, so they are issued concurrently rather than one after another.
+        results = await asyncio.gather(
+            *(self.fetch_acs_data(fips, year, geo_level, chunk) for chunk in chunks), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, HTTPException):
                 # If one chunk fails, log it but continue if possible
-                logger.warning(f"Failed to fetch a chunk of ACS data: {e.detail}")
+                logger.warning("Failed to fetch a chunk of ACS data: {}", result.detail)
+                failed_chunks += 1
+            elif isinstance(result, BaseException):
+                raise result
+            elif result:
+                merged_results.update(result)
+        # With every chunk failed there is no partial data to continue with; an empty result here
+        # would read as "no data for this area" rather than an upstream outage.
+        if chunks and failed_chunks == len(chunks):
+            raise HTTPException(status_code=503, detail="Census API service is unavailable for all ACS data requests.")
         return merged_results
 
     async def fetch_pep_county_components(self, fips: FipsCode) -> Optional[Dict[str, Any]]:
@@ -141,15 +216,14 @@ class CensusAPIClient:
         # --- Population ---
         pop_url = f"https://api.census.gov/data/{LATEST_PEP_YEAR}/pep/population"
         pop_params = {
-            "get": "POP",
+            "get": ",".join(PEP_POP_VARS),
             "for": f"county:{fips.county}", "in": f"state:{fips.state}", "key": self.api_key
         }
 
         # --- Components ---
         comp_url = f"https://api.census.gov/data/{LATEST_PEP_YEAR}/pep/components"
-        comp_vars = "BIRTHS,DEATHS,DOMESTICMIG,INTERNATIONALMIG,NATURALINC"
         comp_params = {
-            "get": comp_vars,
+            "get": ",".join(PEP_COMPONENT_VARS),
             "for": f"county:{fips.county}", "in": f"state:{fips.state}", "key": self.api_key
         }
 
@@ -162,28 +236,27 @@ class CensusAPIClient:
             pop_result, comp_result = results
 
             merged_data = {}
+            parse = self._parse_census_value
 
+            # The geography columns (state, county) follow the requested variables, so only the
+            # leading columns are parsed and merged.
             # Process population result
             if isinstance(pop_result, Exception):
-                logger.warning(f"Failed to fetch PEP population data: {pop_result}")
+                logger.warning("Failed to fetch PEP population data: {}", pop_result)
             elif pop_result:
-                header, values = pop_result[0], pop_result[1]
-                merged_data.update(dict(zip(header, [self._parse_census_value(v) for v in values])))
+                count = len(PEP_POP_VARS)
+                merged_data.update(zip(pop_result[0][:count], map(parse, pop_result[1][:count])))
 
             # Process components result
             if isinstance(comp_result, Exception):
-                logger.warning(f"Failed to fetch PEP components data: {comp_result}")
+                logger.warning("Failed to fetch PEP components data: {}", comp_result)
             elif comp_result:
-                header, values = comp_result[0], comp_result[1]
-                merged_data.update(dict(zip(header, [self._parse_census_value(v) for v in values])))
-
-            # Clean up geo keys from the final dictionary
-            merged_data.pop('state', None)
-            merged_data.pop('county', None)
+                count = len(PEP_COMPONENT_VARS)
+                merged_data.update(zip(comp_result[0][:count], map(parse, comp_result[1][:count])))
 
             return merged_data if merged_data else None
         except Exception as e:
-            logger.error(f"An unexpected error occurred during concurrent PEP fetch: {e}")
+            logger.error("An unexpected error occurred during concurrent PEP fetch: {}", e)
             return None
 
     async def fetch_migration_flows(self, fips: FipsCode) -> Optional[Dict[str, Any]]:
@@ -214,7 +287,7 @@ class CensusAPIClient:
             # Note: Tenacity retry is not applied here as it's a non-critical, third-party API
             response = await self.http_client.get(base_url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             return {
                 "walk_score": data.get("walkscore", None),
                 "walk_score_description": data.get("description", None),
@@ -222,7 +295,7 @@ class CensusAPIClient:
                 "transit_score_description": data.get("transit", {}).get("description", None),
             }
         except (HTTPStatusError, Exception) as e:
-            logger.error(f"Could not fetch Walk Score data: {e}")
+            logger.error("Could not fetch Walk Score data: {}", e)
             return None
 
     async def fetch_tract_geojson(self, state: str, county: str, tract: str) -> Dict[str, Any]:
@@ -236,15 +309,18 @@ class CensusAPIClient:
         try:
             response = await self.http_client.get(base_url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             # The TIGERweb API returns a FeatureCollection. If no features are found, it's a valid but empty collection.
             if not data.get("features"):
-                logger.warning(f"No GeoJSON features found for {state}-{county}-{tract}. Returning empty collection.")
+                logger.warning("No GeoJSON features found for {}-{}-{}. Returning empty collection.", state, county, tract)
                 return {"type": "FeatureCollection", "features": []}
             return data
         except HTTPStatusError as e:
-            logger.error(f"Failed to fetch GeoJSON for {state}-{county}-{tract}: Client error '{e.response.status_code} {e.response.reason_phrase}' for url '{e.request.url}'")
+            logger.error(
+                "Failed to fetch GeoJSON for {}-{}-{}: Client error '{} {}' for url '{}'",
+                state, county, tract, e.response.status_code, e.response.reason_phrase, e.request.url,
+            )
             raise HTTPException(status_code=503, detail="Could not retrieve geographic data for the tract.")
         except Exception as e:
-            logger.error(f"An unexpected error occurred while fetching GeoJSON for {state}-{county}-{tract}: {e}")
+            logger.error("An unexpected error occurred while fetching GeoJSON for {}-{}-{}: {}", state, county, tract, e)
             raise HTTPException(status_code=503, detail="Could not retrieve geographic data for the tract.")
@@ -1,18 +1,18 @@
 import asyncio
-from typing import Dict, List, Any
+from typing import Any, Awaitable, Dict, Iterable, List, Tuple
 
-from httpx import AsyncClient
-from fastapi import HTTPException, Depends
+from fastapi import BackgroundTasks, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from app.schemas.population import (
-    PopulationDataResponse, WalkabilityScores, BenchmarkData, PopulationTrendPoint, MigrationData, NaturalIncreaseData, PopulationDensity, Coordinates
+    WalkabilityScores, BenchmarkData, PopulationTrendPoint, MigrationData, NaturalIncreaseData, PopulationDensity, Coordinates
 )
-from app.services.cache_manager import CacheManager
+from app.db.session import AsyncSessionLocal
+from app.services.cache_manager import CacheManager, RawConnection
 from app.services.geocoding_service import GeocodingService
 from app.services.census_api_client import CensusAPIClient
-from app.services.data_processor import DataProcessor
+from app.services.data_processor import DataProcessor, AGE_VARS
 
 # --- Constants ---
 LATEST_ACS_YEAR = 2023
@@ -32,18 +32,49 @@ ACS_VARS = {
     "B01001_003E": "m_under_5", "B01001_004E": "m_5_9", "B01001_005E": "m_10_14", "B01001_006E": "m_15_17", "B01001_007E": "m_18_19", "B01001_008E": "m_20", "B01001_009E": "m_21", "B01001_010E": "m_22_24", "B01001_011E": "m_25_29", "B01001_012E": "m_30_34", "B01001_013E": "m_35_39", "B01001_014E": "m_40_44", "B01001_015E": "m_45_49", "B01001_016E": "m_50_54", "B01001_017E": "m_55_59", "B01001_018E": "m_60_61", "B01001_019E": "m_62_64", "B01001_020E": "m_65_66", "B01001_021E": "m_67_69", "B01001_022E": "m_70_74", "B01001_023E": "m_75_79", "B01001_024E": "m_80_84", "B01001_025E": "m_85_over",
     "B01001_027E": "f_under_5", "B01001_028E": "f_5_9", "B01001_029E": "f_10_14", "B01001_030E": "f_15_17", "B01001_031E": "f_18_19", "B01001_032E": "f_20", "B01001_033E": "f_21", "B01001_034E": "f_22_24", "B01001_035E": "f_25_29", "B01001_036E": "f_30_34", "B01001_037E": "f_35_39", "B01001_038E": "f_40_44", "B01001_039E": "f_45_49", "B01001_040E": "f_50_54", "B01001_041E": "f_55_59", "B01001_042E": "f_60_61", "B01001_043E": "f_62_64", "B01001_044E": "f_65_66", "B01001_045E": "f_67_69", "B01001_046E": "f_70_74", "B01001_047E": "f_75_79", "B01001_048E": "f_80_84", "B01001_049E": "f_85_over",
 }
+# Margins of error are only requested for the estimates the response reports them for,
+# which keeps the latest-year dataset within three Census API requests.
+ACS_MOE_VARS = (
+    "B01003_001E", "B01002_001E", "B19013_001E", "B25010_001E", "B11001_001E", "B25077_001E",
+    "B25064_001E", "B25035_001E", "B01001_002E", "B01001_026E", *AGE_VARS,
+)
 SUBJECT_VARS = {"S1701_C03_001E": "poverty_rate_percent"}
 PROFILE_VARS = {"DP03_0025E": "mean_commute_time"}
 
-def _expand_vars_with_moe(var_dict: Dict[str, str]) -> List[str]:
-    """Expands a dict of estimate variables to include margin of error variables."""
+def _expand_vars_with_moe(var_dict: Dict[str, str], moe_vars: Iterable[str] | None = None) -> List[str]:
+    """
+    Expands a dict of estimate variables to include margin of error variables,
+    either for every estimate or only for those listed in moe_vars.
+    """
+    with_moe = set(var_dict if moe_vars is None else moe_vars)
     all_vars = []
     for var_e in var_dict.keys():
         all_vars.append(var_e)
-        if var_e.endswith("E"):
+        if var_e.endswith("E") and var_e in with_moe:
             all_vars.append(var_e[:-1] + "M")
     return all_vars
 
+# Request variable lists are fixed, so they are expanded once at import rather than per request.
+ACS_REQUEST_VARS = tuple(_expand_vars_with_moe(ACS_VARS, ACS_MOE_VARS))
+SUBJECT_REQUEST_VARS = tuple(_expand_vars_with_moe(SUBJECT_VARS))
+PROFILE_REQUEST_VARS = tuple(_expand_vars_with_moe(PROFILE_VARS))
+
+# Tasks without which no response can be built; any other failed task is left out of the response.
+CRITICAL_TASKS = frozenset({"latest_year_data", "tract_trend"})
+
+async def _run_task(name: str, coro: Awaitable[Any]) -> Any:
+    """
+    Awaits one upstream fetch. A failed critical task raises a 503, which makes the enclosing
+    TaskGroup cancel its still-running siblings; a failed optional task yields None.
+    """
+    try:
+        return await coro
+    except Exception as e:
+        logger.error("Task '{}' failed: {}", name, e)
+        if name in CRITICAL_TASKS:
+            raise HTTPException(status_code=503, detail=f"Failed to fetch required data for {name}.")
+        return None
+
 class CensusService:
     def __init__(
         self,
@@ -58,48 +89,58 @@ class CensusService:
         self.processor = data_processor
         logger.info("CensusService initialized with all sub-services.")
 
-    async def get_market_data_for_address(self, address: str, db: AsyncSession) -> PopulationDataResponse:
-        cached_response = await self.cache.get_cached_response(address, db)
-        if cached_response:
-            return cached_response
-
-        geo_info = await self.geocoder.geocode_address(address)
+    async def get_cached_market_data_body(self, address: str, conn: RawConnection) -> bytes | None:
+        return await self.cache.get_cached_body(address, conn)
+
+    async def get_market_data_body_for_address(self, address: str, conn: RawConnection, background: BackgroundTasks) -> bytes:
+        """
+        Fetches fresh market data from the upstream APIs and returns its serialized JSON body.
+        Storing it in the cache is scheduled on background, after the response has been sent.
+        """
+        # A rebuilt response (e.g. after its cache entry was deleted) reuses the stored geocode.
+        geo_info = await self.cache.get_cached_geocode(address, conn)
+        fetched_geo_info = None
+        if geo_info is None:
+            geo_info = fetched_geo_info = await self.geocoder.geocode_address(address)
         fips, coords_dict, aland = geo_info['fips'], geo_info['coords'], geo_info['aland']
         coords = Coordinates(**coords_dict)
 
         historical_years = list(range(LATEST_ACS_YEAR - HISTORICAL_YEARS_COUNT + 1, LATEST_ACS_YEAR + 1))
-        
-        async def fetch_historical_trend(geo_level: str, years: List[int]):
-            tasks = [self.api_client.fetch_acs_data(fips, year, geo_level, ["B01003_001E"]) for year in years]
-            results = await asyncio.gather(*tasks)
-            return sorted(
-                [PopulationTrendPoint(year=years[i], population=res["B01003_001E"]) for i, res in enumerate(results) if res and res.get("B01003_001E")],
-                key=lambda x: x.year
-            )
+        county_key = f"{fips.state}{fips.county}"
+        fetched_county_trend = None
+
+        async def fetch_county_trend() -> List[PopulationTrendPoint]:
+            # The county benchmark is the same for every address in the county, so it is shared via the cache.
+            nonlocal fetched_county_trend
+            trend = await self.cache.get_cached_benchmark_trend('county', county_key, historical_years[0], historical_years[-1], conn)
+            if trend is None:
+                trend = fetched_county_trend = await self.api_client.fetch_population_trend(fips, 'county', historical_years)
+            return trend
 
         tasks = {
-            "latest_year_data": self.api_client.fetch_large_acs_dataset(fips, LATEST_ACS_YEAR, 'tract', _expand_vars_with_moe(ACS_VARS)),
-            "subject_data": self.api_client.fetch_acs_data(fips, LATEST_ACS_YEAR, 'tract', _expand_vars_with_moe(SUBJECT_VARS), endpoint="acs/acs5/subject"),
-            "profile_data": self.api_client.fetch_acs_data(fips, LATEST_ACS_YEAR, 'tract', _expand_vars_with_moe(PROFILE_VARS), endpoint="acs/acs5/profile"),
-            "tract_trend": fetch_historical_trend('tract', historical_years),
-            "county_trend": fetch_historical_trend('county', historical_years),
+            "latest_year_data": self.api_client.fetch_large_acs_dataset(fips, LATEST_ACS_YEAR, 'tract', ACS_REQUEST_VARS),
+            "subject_data": self.api_client.fetch_acs_data(fips, LATEST_ACS_YEAR, 'tract', SUBJECT_REQUEST_VARS, endpoint="acs/acs5/subject"),
+            "profile_data": self.api_client.fetch_acs_data(fips, LATEST_ACS_YEAR, 'tract', PROFILE_REQUEST_VARS, endpoint="acs/acs5/profile"),
+            # The latest year's tract population is already part of latest_year_data, so only prior years are fetched.
+            "tract_trend": self.api_client.fetch_population_trend(fips, 'tract', historical_years[:-1]),
+            "county_trend": fetch_county_trend(),
             "county_drivers": self.api_client.fetch_pep_county_components(fips),
             "migration_flows": self.api_client.fetch_migration_flows(fips),
             "walkability_data": self.api_client.fetch_walkability_scores(address, lat=coords.lat, lon=coords.lon),
         }
-        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-        task_results = dict(zip(tasks.keys(), results))
-
-        for name, result in task_results.items():
-            if isinstance(result, Exception):
-                logger.error(f"Task '{name}' failed: {result}")
-                if name in ["latest_year_data", "tract_trend"]: # Critical data
-                    raise HTTPException(status_code=503, detail=f"Failed to fetch required data for {name}.")
-                task_results[name] = None
-        
+        try:
+            async with asyncio.TaskGroup() as tg:
+                running = {name: tg.create_task(_run_task(name, coro)) for name, coro in tasks.items()}
+        except ExceptionGroup as eg:
+            # Only critical failures escape _run_task; surface the first one's 503.
+            raise eg.exceptions[0]
+        task_results = {name: task.result() for name, task in running.items()}
+
         # --- Prepare data for the processor ---
         acs_data = task_results["latest_year_data"]
         tract_trend = task_results["tract_trend"]
+        if acs_data.get("B01003_001E"):
+            tract_trend.append(PopulationTrendPoint.model_construct(year=LATEST_ACS_YEAR, population=acs_data["B01003_001E"]))
         county_trend = task_results["county_trend"]
 
         # Walkability
@@ -150,22 +191,46 @@ class CensusService:
             profile_data=task_results["profile_data"],
             trend=tract_trend,
             projection=self.processor.project_tract_population(acs_data, county_trend),
-            benchmarks=BenchmarkData(county_trend=county_trend),
+            # The county trend is optional; without it the response simply has no benchmark.
+            benchmarks=BenchmarkData(county_trend=county_trend) if county_trend is not None else None,
             walkability=walkability, migration=migration_data, natural_increase=natural_increase_data,
             population_density=population_density,
         )
 
-        await self.cache.set_cached_response(address, response_data, db)
-        return response_data
-
-    async def get_all_cached_addresses(self, db: AsyncSession) -> List[str]:
-        return await self.cache.get_all_cached_addresses(db)
+        body = response_data.model_dump_json(by_alias=True).encode("utf-8")
+        county_trend_entry = (county_key, historical_years[0], historical_years[-1], fetched_county_trend) if fetched_county_trend else None
+        background.add_task(self._persist_market_data, address, body, fetched_geo_info, county_trend_entry)
+        return body
+
+    async def _persist_market_data(
+        self, address: str, body: bytes, geo_info: Dict[str, Any] | None,
+        county_trend_entry: Tuple[str, int, int, List[PopulationTrendPoint]] | None,
+    ) -> None:
+        """
+        Stores a freshly built response, and any geocode or county trend fetched for it, in the cache.
+        Runs after the response is sent, in its own session; a failed write only costs a future cache miss.
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                if geo_info is not None:
+                    await self.cache.set_cached_geocode(address, geo_info, db)
+                if county_trend_entry is not None:
+                    county_key, start_year, end_year, trend = county_trend_entry
+                    await self.cache.set_cached_benchmark_trend('county', county_key, start_year, end_year, trend, db)
+                await self.cache.set_cached_response(address, body, db)
+        except Exception:
+            logger.exception("Failed to persist market data for '{}' to the cache.", address)
+
+    async def list_cached_addresses(
+        self, conn: RawConnection, after: str | None, limit: int
+    ) -> Tuple[List[str], str | None]:
+        return await self.cache.list_cached_addresses(conn, after, limit)
 
     async def delete_cache_for_address(self, address: str, db: AsyncSession):
         await self.cache.delete_cache_for_address(address, db)
 
     async def get_tract_geojson(self, state: str, county: str, tract: str) -> Dict[str, Any]:
-        logger.info(f"Fetching GeoJSON for state={state}, county={county}, tract={tract}")
+        logger.info("Fetching GeoJSON for state={}, county={}, tract={}", state, county, tract)
         try:
             return await self.api_client.fetch_tract_geojson(state, county, tract)
         except Exception as e:
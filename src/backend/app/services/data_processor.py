@@ -1,18 +1,50 @@
 import math
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
 import numpy as np
 from fastapi import HTTPException
 from loguru import logger
 
 from app.schemas.population import (
-    PopulationDataResponse, AgeDistribution, Demographics, Coordinates,
-    GrowthMetrics, PopulationDensity, PopulationTrend,
-    PopulationTrendPoint, BenchmarkData, SexDistribution, HousingMetrics,
+    PopulationDataResponse, AgeDistribution, Demographics,
+    GrowthMetrics, PopulationTrend,
+    PopulationTrendPoint, SexDistribution, HousingMetrics,
     HouseholdComposition, RaceAndEthnicity, EconomicContext, ValueWithMoe
 )
 
 LATEST_ACS_YEAR = 2023
 
+# --- Summed ACS variable groups ---
+# Built once at import; the matching margin of error variable names are derived here too.
+def _moe_vars(e_vars: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Maps estimate variables (ending in 'E') to their margin of error variables (ending in 'M')."""
+    return tuple(var_e[:-1] + 'M' for var_e in e_vars)
+
+AGE_UNDER_18_VARS = ("B01001_003E", "B01001_004E", "B01001_005E", "B01001_006E", "B01001_027E", "B01001_028E", "B01001_029E", "B01001_030E")
+AGE_18_TO_34_VARS = ("B01001_007E", "B01001_008E", "B01001_009E", "B01001_010E", "B01001_011E", "B01001_012E", "B01001_031E", "B01001_032E", "B01001_033E", "B01001_034E", "B01001_035E", "B01001_036E")
+AGE_35_TO_64_VARS = ("B01001_013E", "B01001_014E", "B01001_015E", "B01001_016E", "B01001_017E", "B01001_018E", "B01001_019E", "B01001_037E", "B01001_038E", "B01001_039E", "B01001_040E", "B01001_041E", "B01001_042E", "B01001_043E")
+AGE_OVER_65_VARS = ("B01001_020E", "B01001_021E", "B01001_022E", "B01001_023E", "B01001_024E", "B01001_025E", "B01001_044E", "B01001_045E", "B01001_046E", "B01001_047E", "B01001_048E", "B01001_049E")
+# All age variables laid out bucket by bucket, so each bucket is a contiguous run starting at its offset.
+AGE_VARS = AGE_UNDER_18_VARS + AGE_18_TO_34_VARS + AGE_35_TO_64_VARS + AGE_OVER_65_VARS
+AGE_MOE_VARS = _moe_vars(AGE_VARS)
+# Estimates followed by their MOEs, so both are gathered from the ACS data in one pass.
+AGE_ESTIMATE_AND_MOE_VARS = AGE_VARS + AGE_MOE_VARS
+AGE_BUCKET_STARTS = np.cumsum([0, len(AGE_UNDER_18_VARS), len(AGE_18_TO_34_VARS), len(AGE_35_TO_64_VARS)])
+# Years ahead of LATEST_ACS_YEAR that the tract projection covers.
+PROJECTION_STEPS = np.arange(1, 4)
+BACHELORS_OR_HIGHER_VARS = ("B15003_022E", "B15003_023E", "B15003_024E", "B15003_025E")
+OTHER_NON_HISPANIC_VARS = ("B03002_005E", "B03002_007E", "B03002_008E", "B03002_009E")
+
+def _safe_div_percent(numerator: Optional[Union[int, float]], denominator: Optional[Union[int, float]]) -> Optional[float]:
+    """Divides two ACS values as a percentage rounded to one decimal, or None if either is missing or the denominator is zero."""
+    if denominator is None or denominator == 0 or numerator is None:
+        return None
+    return round((numerator / denominator) * 100, 1)
+
+def _sum_vars(data: Dict[str, Any], variables: Tuple[str, ...]) -> Union[int, float]:
+    """Sums ACS variables, treating missing or suppressed (None) values as zero."""
+    # filter(None, ...) drops None (and zeros, which do not change the sum) without a per-key branch in Python.
+    return sum(filter(None, map(data.get, variables)))
+
 class DataProcessor:
     """Contains business logic for calculations, projections, and data formatting."""
 
@@ -22,50 +54,55 @@ class DataProcessor:
         if estimate is not None and moe is not None and estimate != 0:
             # Per Census guidance, use absolute value of estimate for RMOE calculation
             relative_moe = round((abs(moe) / abs(estimate)) * 100, 1)
-        return ValueWithMoe(value=estimate, relative_moe=relative_moe)
-
-    def _create_sum_with_moe(self, acs_data: Dict[str, Any], e_vars: List[str]) -> ValueWithMoe:
-        """Calculates a sum and its combined MOE from a list of ACS variables."""
-        estimate = sum(acs_data.get(v, 0) or 0 for v in e_vars)
-
-        moe_sum_sq = 0
-        for var_e in e_vars:
-            var_m = var_e[:-1] + 'M'
-            moe = acs_data.get(var_m)
-            if moe is not None:
-                moe_sum_sq += moe**2
-
-        moe = math.sqrt(moe_sum_sq) if moe_sum_sq > 0 else None
-        return self._create_value_with_moe(estimate, moe)
+        # Both fields already have their schema types (parsed Census numbers and a rounded float),
+        # so the ~20 instances per response are constructed without validation.
+        return ValueWithMoe.model_construct(value=estimate, relative_moe=relative_moe)
+
+    def _create_age_distribution(self, acs_data: Dict[str, Any]) -> AgeDistribution:
+        """Sums the age buckets and their combined MOEs in one vectorized pass over the age variables."""
+        # Row 0 holds the estimates and row 1 the MOEs; squaring the MOE row in place lets a single
+        # reduction produce every bucket's estimate and MOE sum of squares.
+        values = np.fromiter(
+            (acs_data.get(v) or 0 for v in AGE_ESTIMATE_AND_MOE_VARS), dtype=np.int64, count=len(AGE_ESTIMATE_AND_MOE_VARS)
+        ).reshape(2, len(AGE_VARS))
+        np.square(values[1], out=values[1])
+        bucket_estimates, bucket_moe_sum_sqs = np.add.reduceat(values, AGE_BUCKET_STARTS, axis=1)
+
+        under_18, _18_to_34, _35_to_64, over_65 = (
+            self._create_value_with_moe(int(estimate), math.sqrt(moe_sum_sq) if moe_sum_sq > 0 else None)
+            for estimate, moe_sum_sq in zip(bucket_estimates.tolist(), bucket_moe_sum_sqs.tolist())
+        )
+        return AgeDistribution(under_18=under_18, _18_to_34=_18_to_34, _35_to_64=_35_to_64, over_65=over_65)
 
     def project_tract_population(
-        self, latest_tract_data: Optional[Dict[str, Any]], county_trend: List[PopulationTrendPoint]
+        self, latest_tract_data: Optional[Dict[str, Any]], county_trend: Optional[List[PopulationTrendPoint]]
     ) -> List[PopulationTrendPoint]:
         """Projects future tract population based on historical county growth rates."""
         logger.info("Starting tract population projection.")
-        if not latest_tract_data or not latest_tract_data.get("B01003_001E") or len(county_trend) < 2:
+        # county_trend is None when its (optional) fetch failed.
+        if not latest_tract_data or not latest_tract_data.get("B01003_001E") or not county_trend or len(county_trend) < 2:
             logger.warning("Not enough historical data to perform projection. Returning empty list.")
             return []
 
         base_population = latest_tract_data.get("B01003_001E") or 0
-        county_growth_rates = [
-            county_trend[i].population / county_trend[i-1].population
-            for i in range(1, len(county_trend)) if county_trend[i-1].population > 0
-        ]
-        
-        if not county_growth_rates:
+        county_pops = np.fromiter((p.population for p in county_trend), dtype=np.float64, count=len(county_trend))
+        previous, current = county_pops[:-1], county_pops[1:]
+        has_base = previous > 0
+        county_growth_rates = current[has_base] / previous[has_base]
+
+        if not county_growth_rates.size:
             logger.warning("Could not calculate any county growth rates. Returning empty projection.")
             return []
 
-        avg_growth_factor = np.mean(county_growth_rates)
-        projections = []
-        current_pop = float(base_population)
-        
-        for year in range(LATEST_ACS_YEAR + 1, LATEST_ACS_YEAR + 4):
-            current_pop *= avg_growth_factor
-            projections.append(PopulationTrendPoint(year=year, population=int(round(current_pop)), is_projection=True))
-        
-        logger.info(f"Tract population projection finished with {len(projections)} data points.")
+        # Compounding the average growth factor in closed form: base * factor^k for k = 1..3.
+        avg_growth_factor = county_growth_rates.mean()
+        projected_pops = np.rint(float(base_population) * avg_growth_factor ** PROJECTION_STEPS).astype(np.int64)
+        projections = [
+            PopulationTrendPoint.model_construct(year=LATEST_ACS_YEAR + int(step), population=int(pop), is_projection=True)
+            for step, pop in zip(PROJECTION_STEPS, projected_pops)
+        ]
+
+        logger.info("Tract population projection finished with {} data points.", len(projections))
         return projections
 
     def _calculate_growth_metrics(self, trend: List[PopulationTrendPoint]) -> GrowthMetrics:
@@ -74,16 +111,14 @@ class DataProcessor:
         if len(trend) < 2:
             return metrics
 
-        end_pop, start_pop = trend[-1].population, trend[0].population
+        # A handful of scalars: plain float arithmetic is far cheaper here than building NumPy arrays.
+        end_pop, prev_pop, start_pop = trend[-1].population, trend[-2].population, trend[0].population
         periods = trend[-1].year - trend[0].year
         if start_pop > 0 and periods > 0:
             metrics.cagr = round((((end_pop / start_pop) ** (1 / periods)) - 1) * 100, 2)
-        
-        if len(trend) > 1:
-            prev_pop = trend[-2].population
-            if prev_pop > 0:
-                metrics.yoy_growth = round(((end_pop - prev_pop) / prev_pop) * 100, 2)
-        
+        if prev_pop > 0:
+            metrics.yoy_growth = round(((end_pop - prev_pop) / prev_pop) * 100, 2)
+
         metrics.absolute_change = end_pop - start_pop
         return metrics
 
@@ -100,56 +135,46 @@ class DataProcessor:
         trend = kwargs.get("trend", [])
         projection = kwargs.get("projection", [])
         total_pop_estimate = (trend[-1].population if trend else all_census_data.get("B01003_001E", 0))
-        
-        # Helper for safe division and rounding
-        def safe_div_percent(numerator, denominator):
-            if denominator is None or denominator == 0 or numerator is None:
-                return None
-            return round((numerator / denominator) * 100, 1)
 
         # Age and Sex Distribution
-        age_distribution = AgeDistribution(
-            under_18=self._create_sum_with_moe(all_census_data, ["B01001_003E", "B01001_004E", "B01001_005E", "B01001_006E", "B01001_027E", "B01001_028E", "B01001_029E", "B01001_030E"]),
-            _18_to_34=self._create_sum_with_moe(all_census_data, ["B01001_007E", "B01001_008E", "B01001_009E", "B01001_010E", "B01001_011E", "B01001_012E", "B01001_031E", "B01001_032E", "B01001_033E", "B01001_034E", "B01001_035E", "B01001_036E"]),
-            _35_to_64=self._create_sum_with_moe(all_census_data, ["B01001_013E", "B01001_014E", "B01001_015E", "B01001_016E", "B01001_017E", "B01001_018E", "B01001_019E", "B01001_037E", "B01001_038E", "B01001_039E", "B01001_040E", "B01001_041E", "B01001_042E", "B01001_043E"]),
-            over_65=self._create_sum_with_moe(all_census_data, ["B01001_020E", "B01001_021E", "B01001_022E", "B01001_023E", "B01001_024E", "B01001_025E", "B01001_044E", "B01001_045E", "B01001_046E", "B01001_047E", "B01001_048E", "B01001_049E"])
-        )
+        age_distribution = self._create_age_distribution(all_census_data)
         male_total = all_census_data.get("B01001_002E")
         female_total = all_census_data.get("B01001_026E")
+        sex_total = (male_total or 0) + (female_total or 0)
         sex_distribution = SexDistribution(
             male=self._create_value_with_moe(male_total, all_census_data.get("B01001_002M")),
             female=self._create_value_with_moe(female_total, all_census_data.get("B01001_026M")),
-            percent_male=safe_div_percent(male_total, (male_total or 0) + (female_total or 0)),
-            percent_female=safe_div_percent(female_total, (male_total or 0) + (female_total or 0))
+            percent_male=_safe_div_percent(male_total, sex_total),
+            percent_female=_safe_div_percent(female_total, sex_total)
         )
 
         # Demographics
-        bachelors_or_higher = sum(all_census_data.get(k, 0) or 0 for k in ["B15003_022E", "B15003_023E", "B15003_024E", "B15003_025E"])
+        bachelors_or_higher = _sum_vars(all_census_data, BACHELORS_OR_HIGHER_VARS)
         total_pop_25_over = all_census_data.get("B15003_001E")
         
         # Household Comp
         total_households = all_census_data.get("B11001_001E")
         household_comp = HouseholdComposition(
             total_households=self._create_value_with_moe(total_households, all_census_data.get("B11001_001M")),
-            percent_family_households=safe_div_percent(all_census_data.get("B11001_002E"), total_households),
-            percent_married_couple_family=safe_div_percent(all_census_data.get("B11001_003E"), total_households),
-            percent_non_family_households=safe_div_percent(all_census_data.get("B11001_007E"), total_households)
+            percent_family_households=_safe_div_percent(all_census_data.get("B11001_002E"), total_households),
+            percent_married_couple_family=_safe_div_percent(all_census_data.get("B11001_003E"), total_households),
+            percent_non_family_households=_safe_div_percent(all_census_data.get("B11001_007E"), total_households)
         )
 
         # Race/Ethnicity
         race_total = all_census_data.get("B03002_001E")
-        other_non_hispanic = sum(all_census_data.get(k, 0) or 0 for k in ["B03002_005E", "B03002_007E", "B03002_008E", "B03002_009E"])
+        other_non_hispanic = _sum_vars(all_census_data, OTHER_NON_HISPANIC_VARS)
         race_ethnicity = RaceAndEthnicity(
-            percent_white_non_hispanic=safe_div_percent(all_census_data.get("B03002_003E"), race_total),
-            percent_black_non_hispanic=safe_div_percent(all_census_data.get("B03002_004E"), race_total),
-            percent_asian_non_hispanic=safe_div_percent(all_census_data.get("B03002_006E"), race_total),
-            percent_hispanic=safe_div_percent(all_census_data.get("B03002_012E"), race_total),
-            percent_other_non_hispanic=safe_div_percent(other_non_hispanic, race_total)
+            percent_white_non_hispanic=_safe_div_percent(all_census_data.get("B03002_003E"), race_total),
+            percent_black_non_hispanic=_safe_div_percent(all_census_data.get("B03002_004E"), race_total),
+            percent_asian_non_hispanic=_safe_div_percent(all_census_data.get("B03002_006E"), race_total),
+            percent_hispanic=_safe_div_percent(all_census_data.get("B03002_012E"), race_total),
+            percent_other_non_hispanic=_safe_div_percent(other_non_hispanic, race_total)
         )
 
         demographics = Demographics(
             median_household_income=self._create_value_with_moe(all_census_data.get("B19013_001E"), all_census_data.get("B19013_001M")),
-            percent_bachelors_or_higher=safe_div_percent(bachelors_or_higher, total_pop_25_over),
+            percent_bachelors_or_higher=_safe_div_percent(bachelors_or_higher, total_pop_25_over),
             avg_household_size=self._create_value_with_moe(all_census_data.get("B25010_001E"), all_census_data.get("B25010_001M")),
             household_composition=household_comp,
             race_and_ethnicity=race_ethnicity
@@ -160,19 +185,19 @@ class DataProcessor:
         in_labor_force = all_census_data.get("B23025_002E")
         economic_context = EconomicContext(
             poverty_rate=all_census_data.get("S1701_C03_001E"),
-            labor_force_participation_rate=safe_div_percent(in_labor_force, lf_total_pop),
+            labor_force_participation_rate=_safe_div_percent(in_labor_force, lf_total_pop),
             mean_commute_time_minutes=self._create_value_with_moe(all_census_data.get("DP03_0025E"), all_census_data.get("DP03_0025M"))
         )
 
         # Housing
         housing_metrics = HousingMetrics(
-            percent_renter_occupied=safe_div_percent(all_census_data.get("B25003_003E"), all_census_data.get("B25003_001E")),
+            percent_renter_occupied=_safe_div_percent(all_census_data.get("B25003_003E"), all_census_data.get("B25003_001E")),
             median_home_value=self._create_value_with_moe(all_census_data.get("B25077_001E"), all_census_data.get("B25077_001M")),
             median_gross_rent=self._create_value_with_moe(all_census_data.get("B25064_001E"), all_census_data.get("B25064_001M")),
             median_year_structure_built=self._create_value_with_moe(all_census_data.get("B25035_001E"), all_census_data.get("B25035_001M")),
-            vacancy_rate=safe_div_percent(all_census_data.get("B25002_003E"), all_census_data.get("B25002_001E")),
-            rental_vacancy_rate=safe_div_percent(all_census_data.get("B25004_002E"), (all_census_data.get("B25003_003E", 0) or 0) + (all_census_data.get("B25004_002E", 0) or 0)),
-            homeowner_vacancy_rate=safe_div_percent(all_census_data.get("B25004_004E"), (all_census_data.get("B25003_002E", 0) or 0) + (all_census_data.get("B25004_004E", 0) or 0))
+            vacancy_rate=_safe_div_percent(all_census_data.get("B25002_003E"), all_census_data.get("B25002_001E")),
+            rental_vacancy_rate=_safe_div_percent(all_census_data.get("B25004_002E"), _sum_vars(all_census_data, ("B25003_003E", "B25004_002E"))),
+            homeowner_vacancy_rate=_safe_div_percent(all_census_data.get("B25004_004E"), _sum_vars(all_census_data, ("B25003_002E", "B25004_004E")))
         )
         
         # Final Assembly
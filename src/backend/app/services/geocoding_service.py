@@ -1,46 +1,98 @@
-from typing import Dict, Any
-from httpx import AsyncClient, HTTPStatusError
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import asyncio
+from typing import Dict, Any, Optional
+import asyncpg
+import orjson
+from httpx import AsyncClient
 from fastapi import HTTPException
 from loguru import logger
 
 from app.schemas.population import FipsCode
 from app.core.config import settings
+from app.services.census_api_client import retry_strategy
 
 # Use the latest available ACS 5-year data release year for geocoding vintages.
 LATEST_ACS_YEAR = 2023
-
-# Define a retry strategy for network-related or server-side errors
-retry_strategy = retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(HTTPStatusError),
+# Nominatim's usage policy allows at most one request per second.
+NOMINATIM_MIN_INTERVAL = 1.0
+
+# Reserves the next Nominatim slot in a row shared by every worker process. Each reservation pushes
+# next_at one interval further, and the row lock serializes concurrent reservations, so the policy
+# holds across all workers. Returns how many seconds to wait until the reserved slot starts.
+RESERVE_RATE_LIMIT_SLOT_SQL = (
+    "UPDATE upstream_rate_limit SET next_at = GREATEST(next_at, clock_timestamp()) + make_interval(secs => $2) "
+    "WHERE name = $1 RETURNING EXTRACT(EPOCH FROM next_at - clock_timestamp())::float8 - $2"
 )
 
 
+class AddressNotMatchedError(ValueError):
+    """A geocoder answered successfully but found no match (or no tract) for the address."""
+
+
+class AddressNotGeocodedError(HTTPException):
+    """The definitive 404 raised when every geocoder answered and none matched the address."""
+    def __init__(self):
+        super().__init__(status_code=404, detail="Address could not be geocoded. Please check for typos or try a more specific address.")
+
+
 class GeocodingService:
     """
     Handles geocoding addresses to find Census FIPS codes.
-    Includes a fallback mechanism for increased reliability.
+    Uses a single-request Census geocoder fast path with a hybrid fallback for increased reliability.
     """
-    def __init__(self, http_client: AsyncClient):
+    def __init__(self, http_client: AsyncClient, pool: Optional[asyncpg.Pool] = None):
         self.http_client = http_client
+        # Holds the rate limit row shared by all workers; without it, only this process is limited.
+        self.pool = pool
+        # Spaces out the start of Nominatim requests across concurrent fallbacks in this process,
+        # used when the shared limiter is unavailable.
+        self._nominatim_lock = asyncio.Lock()
+        self._nominatim_next_at = 0.0
+
+    async def _wait_for_nominatim_slot(self) -> None:
+        """Waits until a Nominatim request may start without exceeding NOMINATIM_MIN_INTERVAL across all workers."""
+        if self.pool is not None:
+            try:
+                delay = await self.pool.fetchval(RESERVE_RATE_LIMIT_SLOT_SQL, "nominatim", NOMINATIM_MIN_INTERVAL)
+            except Exception as e:
+                logger.warning("Shared Nominatim rate limiter unavailable, limiting this worker only: {}", e)
+            else:
+                if delay is not None:
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    return
+                logger.warning("Nominatim rate limit row is missing, limiting this worker only.")
+        await self._wait_for_local_nominatim_slot()
+
+    async def _wait_for_local_nominatim_slot(self) -> None:
+        """Per-process fallback limiter: with N workers the combined rate can reach N requests per interval."""
+        async with self._nominatim_lock:
+            loop = asyncio.get_running_loop()
+            delay = self._nominatim_next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._nominatim_next_at = loop.time() + NOMINATIM_MIN_INTERVAL
 
     async def geocode_address(self, address: str) -> Dict[str, Any]:
         """
-        Geocodes an address, trying the primary hybrid geocoder first and falling
-        back to the Census oneline geocoder if the primary fails.
+        Geocodes an address with the Census oneline geographies geocoder, which returns
+        coordinates, FIPS codes and land area in one request. Addresses it cannot match
+        fall back to the slower multi-step hybrid geocoder.
         """
         try:
-            logger.info(f"Attempting to geocode '{address}' with primary hybrid geocoder.")
-            return await self._hybrid_geocode_nominatim_first(address)
+            logger.info("Attempting to geocode '{}' with Census oneline geocoder.", address)
+            return await self._census_oneline_geocode(address)
         except Exception as e:
-            logger.warning(f"Primary hybrid geocoder failed for '{address}': {e}. Attempting fallback.")
-            try:
-                return await self._oneline_address_geocode_fallback(address)
-            except Exception as final_e:
-                logger.error(f"All geocoding attempts failed for '{address}': {final_e}")
-                raise HTTPException(status_code=404, detail="Address could not be geocoded. Please check for typos or try a more specific address.")
+            oneline_error = e
+            logger.warning("Census oneline geocoder failed for '{}': {}. Attempting hybrid fallback.", address, e)
+        try:
+            return await self._hybrid_geocode_nominatim_first(address)
+        except Exception as final_e:
+            logger.error("All geocoding attempts failed for '{}': {}", address, final_e)
+            # Only a definitive "no match" from both geocoders is a 404 (which callers may cache);
+            # timeouts, upstream errors and malformed responses may succeed on retry.
+            if isinstance(oneline_error, AddressNotMatchedError) and isinstance(final_e, AddressNotMatchedError):
+                raise AddressNotGeocodedError() from final_e
+            raise HTTPException(status_code=503, detail="Geocoding service is temporarily unavailable. Please try again.")
 
     @retry_strategy
     async def _hybrid_geocode_nominatim_first(self, address: str) -> Dict[str, Any]:
@@ -48,24 +100,26 @@ class GeocodingService:
         Geocodes an address using a hybrid approach for maximum accuracy.
         1. Use Nominatim (OpenStreetMap) to get reliable latitude/longitude.
         2. Use the Census Geocoder with these coordinates to get FIPS codes.
-        3. Use Census GEOINFO API to fetch reliable tract land area (AREALAND).
+        3. Use Census GEOINFO API to fetch the tract land area (AREALAND) if step 2 did not return it.
         """
-        logger.info(f"Starting hybrid geocoding for address: '{address}'")
+        logger.info("Starting hybrid geocoding for address: '{}'", address)
 
         # Step 1: Get coordinates from Nominatim
         nominatim_url = "https://nominatim.openstreetmap.org/search"
         params1 = {"q": address, "format": "json", "addressdetails": 1, "limit": 1}
-        headers = {"User-Agent": "CapMatch/1.0"}
         try:
-            res1 = await self.http_client.get(nominatim_url, params=params1, headers=headers)
+            await self._wait_for_nominatim_slot()
+            res1 = await self.http_client.get(nominatim_url, params=params1)
             res1.raise_for_status()
-            data1 = res1.json()
+            data1 = orjson.loads(res1.content)
             if not data1:
-                raise ValueError(f"No address matches found by Nominatim for '{address}'")
+                raise AddressNotMatchedError(f"No address matches found by Nominatim for '{address}'")
             lat = float(data1[0]['lat'])
             lon = float(data1[0]['lon'])
-        except (HTTPStatusError, Exception) as e:
-            logger.warning(f"Nominatim geocoder step failed for '{address}': {e}")
+        except AddressNotMatchedError:
+            raise
+        except Exception as e:
+            logger.warning("Nominatim geocoder step failed for '{}': {}", address, e)
             raise ValueError("Nominatim geocoding failed.") from e
 
         # Step 2: Get geographies (FIPS) using coordinates from Census API
@@ -75,18 +129,26 @@ class GeocodingService:
 
         res2 = await self.http_client.get(geo_url, params=params2)
         res2.raise_for_status()
-        geos = res2.json().get("result", {}).get("geographies", {})
+        geos = orjson.loads(res2.content).get("result", {}).get("geographies", {})
 
-        county = next((g for g in geos.get("Counties", [])), None)
-        tract = next((g for g in geos.get("Census Tracts", [])), None)
+        counties = geos.get("Counties") or []
+        tracts = geos.get("Census Tracts") or []
+        county = counties[0] if counties else None
+        tract = tracts[0] if tracts else None
 
         if not county or not tract:
-            raise ValueError(f"Could not find tract/county for coordinates ({lat}, {lon})")
+            raise AddressNotMatchedError(f"Could not find tract/county for coordinates ({lat}, {lon})")
 
         fips_dict = {"state": county["STATE"], "county": county["COUNTY"], "tract": tract["TRACT"]}
-        aland = int(tract.get("ALAND", 0) or 0)
-
-        # Step 3: Get tract land area (AREALAND) from Census GEOINFO API for better accuracy
+        # The ACS vintage's tract record carries the same AREALAND as GEOINFO, so the extra round trip
+        # is only needed when it is missing.
+        aland = int(tract.get("AREALAND", 0) or 0)
+        if aland:
+            fips_obj = FipsCode(**fips_dict)
+            logger.info("Successfully geocoded '{}' with hybrid method to FIPS {}-{}-{}", address, fips_obj.state, fips_obj.county, fips_obj.tract)
+            return {"fips": fips_obj, "coords": {"lat": lat, "lon": lon}, "aland": aland}
+
+        # Step 3: Get tract land area (AREALAND) from Census GEOINFO API
         geo_info_url = f"https://api.census.gov/data/{LATEST_ACS_YEAR}/geoinfo"
         geo_params = {
             "get": "AREALAND",
@@ -97,45 +159,50 @@ class GeocodingService:
         try:
             res3 = await self.http_client.get(geo_info_url, params=geo_params)
             res3.raise_for_status()
-            geo_data = res3.json()
+            geo_data = orjson.loads(res3.content)
             if len(geo_data) > 1:
                 headers, values = geo_data[0], geo_data[1]
                 geo_record = dict(zip(headers, values))
                 aland = int(geo_record.get("AREALAND", 0) or 0)
         except Exception as e:
-            logger.warning(f"Could not fetch precise land area from GEOINFO API, using fallback. Error: {e}")
+            logger.warning("Could not fetch precise land area from GEOINFO API, using fallback. Error: {}", e)
 
         fips_obj = FipsCode(**fips_dict)
-        logger.info(f"Successfully geocoded '{address}' with hybrid method to FIPS {fips_obj.state}-{fips_obj.county}-{fips_obj.tract}")
+        logger.info("Successfully geocoded '{}' with hybrid method to FIPS {}-{}-{}", address, fips_obj.state, fips_obj.county, fips_obj.tract)
         return {"fips": fips_obj, "coords": {"lat": lat, "lon": lon}, "aland": aland}
 
     @retry_strategy
-    async def _oneline_address_geocode_fallback(self, address: str) -> Dict[str, Any]:
-        """Fallback geocoder using the Census Geocoding API (onelineaddress)."""
-        base_url = "https://geocoding.geo.census.gov/geocoder/locations/onelineaddress"
+    async def _census_oneline_geocode(self, address: str) -> Dict[str, Any]:
+        """
+        Geocodes an address using the Census geographies/onelineaddress endpoint, which
+        returns the match coordinates together with its county and tract in a single call.
+        """
+        base_url = "https://geocoding.geo.census.gov/geocoder/geographies/onelineaddress"
         params = {
             "address": address,
-            "benchmark": "2020",
+            "benchmark": "Public_AR_Current",
+            "vintage": f"ACS{LATEST_ACS_YEAR}_Current",
             "format": "json",
         }
         response = await self.http_client.get(base_url, params=params)
         response.raise_for_status()
-        data = response.json()
+        matches = orjson.loads(response.content).get("result", {}).get("addressMatches")
 
-        if not data.get("result", {}).get("addressMatches"):
-            raise ValueError("No match found by oneline address fallback geocoder.")
+        if not matches:
+            raise AddressNotMatchedError("No match found by Census oneline geocoder.")
 
-        match = data["result"]["addressMatches"][0]
+        match = matches[0]
         geographies = match.get("geographies", {})
-        tracts = geographies.get("Census Tracts", [{}])
+        tracts = geographies.get("Census Tracts") or []
+        tract = tracts[0] if tracts else None
 
-        if not tracts or not tracts[0].get("GEOID"):
-            raise ValueError("Census tract information not found via oneline address fallback geocoder.")
+        if not tract or not tract.get("GEOID"):
+            raise AddressNotMatchedError("Census tract information not found via Census oneline geocoder.")
 
-        geoid = tracts[0]["GEOID"]
+        geoid = tract["GEOID"]
         fips = FipsCode(state=geoid[:2], county=geoid[2:5], tract=geoid[5:])
         coords = match.get("coordinates", {})
-        aland = tracts[0].get("AREALAND", 0)
+        aland = int(tract.get("AREALAND", 0) or 0)
 
-        logger.info(f"Successfully geocoded '{address}' with fallback to FIPS {fips.state}-{fips.county}-{fips.tract}")
+        logger.info("Successfully geocoded '{}' with Census oneline geocoder to FIPS {}-{}-{}", address, fips.state, fips.county, fips.tract)
         return {"fips": fips, "coords": {"lon": coords.get("x"), "lat": coords.get("y")}, "aland": aland}
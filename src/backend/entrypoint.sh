@@ -11,6 +11,15 @@ while ! pg_isready -h $POSTGRES_HOST -p $POSTGRES_PORT -U $POSTGRES_USER -q; do
 done
 echo "PostgreSQL started successfully."
 
+# When routed through PgBouncer, also wait for the pooler before running migrations.
+if [ -n "$PGBOUNCER_HOST" ]; then
+  echo "Waiting for PgBouncer to start..."
+  while ! pg_isready -h $PGBOUNCER_HOST -p ${PGBOUNCER_PORT:-6432} -U $POSTGRES_USER -q; do
+    sleep 1
+  done
+  echo "PgBouncer started successfully."
+fi
+
 # Run database migrations using Alembic.
 echo "Running database migrations..."
 alembic upgrade head
@@ -33,7 +33,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.db.db_base_class import Base
-from app.models.population import PopulationCache # Import your models
+from app.models.population import PopulationCache, GeocodeCache, BenchmarkTrendCache, UpstreamRateLimit # Import your models
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -81,9 +81,10 @@ async def run_migrations_online() -> None:
 
     """
     # --- FIX: Set the sqlalchemy.url in the config object dynamically ---
-    # This ensures that Alembic uses the same database URL as the application,
-    # which is loaded from environment variables.
-    config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+    # This ensures that Alembic uses the same database as the application, loaded from
+    # environment variables, but connects to Postgres directly: DDL must not run through
+    # PgBouncer's transaction pooling.
+    config.set_main_option("sqlalchemy.url", settings.DIRECT_DATABASE_URL)
     # --- END FIX ---
 
     connectable = async_engine_from_config(
@@ -0,0 +1,35 @@
+# src/backend/migrations/versions/a2b7c8d9e0f1_create_benchmark_trend_cache_table.py
+"""Create benchmark_trend_cache table
+
+Revision ID: a2b7c8d9e0f1
+Revises: f1a6b7c8d9e0
+Create Date: 2026-10-15 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2b7c8d9e0f1'
+down_revision: Union[str, None] = 'f1a6b7c8d9e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('benchmark_trend_cache',
+    sa.Column('geo_level', sa.String(), nullable=False),
+    sa.Column('geo_key', sa.String(), nullable=False),
+    sa.Column('start_year', sa.Integer(), nullable=False),
+    sa.Column('end_year', sa.Integer(), nullable=False),
+    sa.Column('trend', sa.JSON(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('geo_level', 'geo_key', 'start_year', 'end_year')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('benchmark_trend_cache')
@@ -0,0 +1,31 @@
+# src/backend/migrations/versions/b3c8d9e0f1a2_purge_caches_keyed_by_old_address_normalization.py
+"""Purge caches keyed by the old address normalization
+
+Revision ID: b3c8d9e0f1a2
+Revises: a2b7c8d9e0f1
+Create Date: 2026-10-15 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c8d9e0f1a2'
+down_revision: Union[str, None] = 'a2b7c8d9e0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The previous normalization deleted punctuation, so distinct addresses such as
+    # "12-34 Main St" and "1234 Main St" shared a key and may hold each other's data.
+    # Responses moved to v5 cache keys and geocodes are re-keyed, so both are purged.
+    op.execute("DELETE FROM population_cache")
+    op.execute("DELETE FROM geocode_cache")
+
+
+def downgrade() -> None:
+    # Purged cache rows are simply refetched; there is nothing to restore.
+    pass
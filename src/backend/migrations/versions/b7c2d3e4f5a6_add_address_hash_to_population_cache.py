@@ -0,0 +1,32 @@
+# src/backend/migrations/versions/b7c2d3e4f5a6_add_address_hash_to_population_cache.py
+"""Add address_hash to population_cache
+
+Revision ID: b7c2d3e4f5a6
+Revises: a6a1b2c3d4e5
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c2d3e4f5a6'
+down_revision: Union[str, None] = 'a6a1b2c3d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows use the previous address normalization (v3 cache keys) and can
+    # never be hit again, so they are purged instead of backfilled.
+    op.execute("DELETE FROM population_cache")
+    op.add_column('population_cache', sa.Column('address_hash', sa.BigInteger(), nullable=False))
+    op.create_index(op.f('ix_population_cache_address_hash'), 'population_cache', ['address_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_population_cache_address_hash'), table_name='population_cache')
+    op.drop_column('population_cache', 'address_hash')
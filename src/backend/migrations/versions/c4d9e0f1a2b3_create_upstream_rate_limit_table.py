@@ -0,0 +1,33 @@
+# src/backend/migrations/versions/c4d9e0f1a2b3_create_upstream_rate_limit_table.py
+"""Create upstream_rate_limit table
+
+Revision ID: c4d9e0f1a2b3
+Revises: b3c8d9e0f1a2
+Create Date: 2026-10-15 18:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d9e0f1a2b3'
+down_revision: Union[str, None] = 'b3c8d9e0f1a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('upstream_rate_limit',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('next_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # The geocoder only updates existing rows, so each rate-limited upstream is seeded here.
+    op.execute("INSERT INTO upstream_rate_limit (name) VALUES ('nominatim')")
+
+
+def downgrade() -> None:
+    op.drop_table('upstream_rate_limit')
@@ -0,0 +1,30 @@
+# src/backend/migrations/versions/c8d3e4f5a6b7_add_search_address_index_to_population_cache.py
+"""Add search_address expression index to population_cache
+
+Revision ID: c8d3e4f5a6b7
+Revises: b7c2d3e4f5a6
+Create Date: 2026-10-15 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d3e4f5a6b7'
+down_revision: Union[str, None] = 'b7c2d3e4f5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Supports keyset pagination of the cached address listing.
+    op.execute(
+        "CREATE INDEX ix_population_cache_search_address "
+        "ON population_cache ((response_data->>'search_address'))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_population_cache_search_address', table_name='population_cache')
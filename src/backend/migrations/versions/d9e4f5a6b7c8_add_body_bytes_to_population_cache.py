@@ -0,0 +1,30 @@
+# src/backend/migrations/versions/d9e4f5a6b7c8_add_body_bytes_to_population_cache.py
+"""Add pre-serialized body_bytes to population_cache
+
+Revision ID: d9e4f5a6b7c8
+Revises: c8d3e4f5a6b7
+Create Date: 2026-10-15 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e4f5a6b7c8'
+down_revision: Union[str, None] = 'c8d3e4f5a6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('population_cache', sa.Column('body_bytes', sa.LargeBinary(), nullable=True))
+    # Backfill existing rows from the JSON column before enforcing NOT NULL.
+    op.execute("UPDATE population_cache SET body_bytes = convert_to(response_data::text, 'UTF8')")
+    op.alter_column('population_cache', 'body_bytes', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('population_cache', 'body_bytes')
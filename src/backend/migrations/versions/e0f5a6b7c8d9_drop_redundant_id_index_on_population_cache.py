@@ -0,0 +1,27 @@
+# src/backend/migrations/versions/e0f5a6b7c8d9_drop_redundant_id_index_on_population_cache.py
+"""Drop redundant id index on population_cache
+
+Revision ID: e0f5a6b7c8d9
+Revises: d9e4f5a6b7c8
+Create Date: 2026-10-15 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0f5a6b7c8d9'
+down_revision: Union[str, None] = 'd9e4f5a6b7c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # population_cache_pkey already indexes id; the duplicate only adds write cost on every insert.
+    op.drop_index(op.f('ix_population_cache_id'), table_name='population_cache')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_population_cache_id'), 'population_cache', ['id'], unique=False)
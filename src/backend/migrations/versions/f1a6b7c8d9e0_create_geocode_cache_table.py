@@ -0,0 +1,37 @@
+# src/backend/migrations/versions/f1a6b7c8d9e0_create_geocode_cache_table.py
+"""Create geocode_cache table
+
+Revision ID: f1a6b7c8d9e0
+Revises: e0f5a6b7c8d9
+Create Date: 2026-10-15 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a6b7c8d9e0'
+down_revision: Union[str, None] = 'e0f5a6b7c8d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('geocode_cache',
+    sa.Column('address_key', sa.String(), nullable=False),
+    sa.Column('state_fips', sa.String(length=2), nullable=False),
+    sa.Column('county_fips', sa.String(length=3), nullable=False),
+    sa.Column('tract_fips', sa.String(length=6), nullable=False),
+    sa.Column('lat', sa.Float(), nullable=False),
+    sa.Column('lon', sa.Float(), nullable=False),
+    sa.Column('aland', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('address_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('geocode_cache')
@@ -0,0 +1,13 @@
+# src/backend/tests/conftest.py
+import os
+
+# Settings are loaded at import time, so placeholder values must exist before any app module is imported.
+for name, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "test",
+    "CENSUS_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,14 @@
+# src/backend/tests/test_data_processor.py
+from app.schemas.population import PopulationTrendPoint
+from app.services.data_processor import DataProcessor
+
+
+def test_projection_without_county_trend_is_empty():
+    # A failed optional county_trend task yields None rather than a list.
+    assert DataProcessor().project_tract_population({"B01003_001E": 1000}, None) == []
+
+
+def test_projection_compounds_average_county_growth():
+    county_trend = [PopulationTrendPoint(year=2021, population=100), PopulationTrendPoint(year=2022, population=110)]
+    projection = DataProcessor().project_tract_population({"B01003_001E": 1000}, county_trend)
+    assert [(p.year, p.population) for p in projection] == [(2024, 1100), (2025, 1210), (2026, 1331)]
@@ -0,0 +1,88 @@
+# src/backend/tests/test_market_data_errors.py
+import httpx
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from tenacity import wait_none
+
+from app.api.v1 import endpoints
+from app.schemas.population import FipsCode
+from app.services.cache_manager import CacheManager, normalize_address
+from app.services.census_api_client import CensusAPIClient
+from app.services.census_service import CensusService
+from app.services.data_processor import DataProcessor
+from app.services.geocoding_service import AddressNotGeocodedError, GeocodingService
+
+ADDRESS = "1 Main St, Palo Alto, CA"
+GEO_INFO = {"fips": FipsCode(state="06", county="085", tract="504601"), "coords": {"lat": 37.4, "lon": -122.1}, "aland": 1234567}
+
+
+class UncachedCacheManager(CacheManager):
+    """Cache manager with every database tier empty, except the geocode for ADDRESS."""
+
+    async def get_cached_body(self, address, conn):
+        return None
+
+    async def get_cached_geocode(self, address, conn):
+        return GEO_INFO
+
+    async def get_cached_benchmark_trend(self, geo_level, geo_key, start_year, end_year, conn):
+        return None
+
+
+def census_handler(request: httpx.Request) -> httpx.Response:
+    """ACS chunk requests fail with 503; single-variable trend requests succeed; everything else is absent."""
+    variables = request.url.params.get("get", "").split(",")
+    if request.url.path.endswith("/acs/acs5") and len(variables) > 2:
+        return httpx.Response(503)
+    if request.url.path.endswith("/acs/acs5"):
+        return httpx.Response(200, json=[["NAME", "B01003_001E", "state", "county", "tract"], ["Tract", "1000", "06", "085", "504601"]])
+    return httpx.Response(404)
+
+
+@pytest.fixture(autouse=True)
+def clear_endpoint_caches(monkeypatch):
+    # Failed Census requests are retried with backoff; the test only cares about the final outcome.
+    monkeypatch.setattr(CensusAPIClient._get.retry, "wait", wait_none())
+    endpoints._ADDR_CACHE.clear()
+    endpoints._NOT_FOUND_CACHE.clear()
+    yield
+    endpoints._ADDR_CACHE.clear()
+    endpoints._NOT_FOUND_CACHE.clear()
+
+
+@pytest.mark.asyncio
+async def test_failed_acs_chunks_return_503_and_are_not_cached():
+    async with httpx.AsyncClient(transport=httpx.MockTransport(census_handler)) as http_client:
+        service = CensusService(UncachedCacheManager(), GeocodingService(http_client), CensusAPIClient(http_client), DataProcessor())
+
+        with pytest.raises(HTTPException) as exc_info:
+            await endpoints._get_or_fetch_market_data(ADDRESS, service, None, BackgroundTasks())
+
+    assert exc_info.value.status_code == 503
+    assert normalize_address(ADDRESS) not in endpoints._NOT_FOUND_CACHE
+    assert normalize_address(ADDRESS) not in endpoints._ADDR_CACHE
+
+
+@pytest.mark.asyncio
+async def test_definitive_geocoding_miss_is_cached():
+    class UnmatchedGeocoder:
+        calls = 0
+
+        async def geocode_address(self, address):
+            self.calls += 1
+            raise AddressNotGeocodedError()
+
+    class NoGeocodeCacheManager(UncachedCacheManager):
+        async def get_cached_geocode(self, address, conn):
+            return None
+
+    geocoder = UnmatchedGeocoder()
+    service = CensusService(NoGeocodeCacheManager(), geocoder, None, DataProcessor())
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            await endpoints._get_or_fetch_market_data(ADDRESS, service, None, BackgroundTasks())
+        assert exc_info.value.status_code == 404
+
+    assert geocoder.calls == 1
+    assert normalize_address(ADDRESS) in endpoints._NOT_FOUND_CACHE
@@ -45,17 +45,27 @@ export const fetchMarketData = async (request: MarketDataRequest): Promise<Popul
   return populationDataResponseSchema.parse(data);
 };
 
-// Fetches the list of cached addresses from the server
+// Fetches the list of cached addresses from the server, following pagination cursors
 const fetchCachedAddresses = async (): Promise<string[]> => {
   const authHeader = await getAuthHeader();
-  const response = await fetch("/api/v1/market-data/cache", {
-    method: "GET",
-    headers: authHeader,
-  });
-  if (!response.ok) {
-    throw new Error("Failed to fetch cached addresses.");
-  }
-  return response.json();
+  const addresses: string[] = [];
+  let cursor: string | null = null;
+  do {
+    const url: string = cursor
+      ? `/api/v1/market-data/cache?cursor=${encodeURIComponent(cursor)}`
+      : "/api/v1/market-data/cache";
+    const response = await fetch(url, {
+      method: "GET",
+      headers: authHeader,
+    });
+    if (!response.ok) {
+      throw new Error("Failed to fetch cached addresses.");
+    }
+    const page: { items: string[]; next_cursor: string | null } = await response.json();
+    addresses.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return addresses;
 };
 
 // Deletes an address from the server-side cache